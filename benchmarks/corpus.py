@@ -0,0 +1,116 @@
+"""Synthetic corpus of API batch files for the preprocessing benchmarks.
+
+Writes N.json files like those saved by the scrapers, with carousel posts,
+captionless posts, a long-tailed hashtag vocabulary and posts with
+heavy hashtag use:
+
+    python -m benchmarks.corpus corpus/hashtag --posts 100000
+"""
+import argparse
+from itertools import accumulate
+import json
+from pathlib import Path
+import random
+from .synthetic import make_media, make_page
+
+SIZES = {'10k': 10 ** 4, '100k': 10 ** 5, '1M': 10 ** 6}
+FIRST_TIMESTAMP = 1577836800
+MAX_HASHTAGS = 30
+
+
+def hashtag_vocabulary(size=20000):
+    """Create hashtags with Zipf-like popularity.
+
+    Args:
+        size (int): Number of distinct hashtags. Defaults to 20000.
+
+    Returns:
+        tuple of list and list: Hashtags without '#' and their
+            cumulative weights.
+
+    """
+    vocabulary = [f'tag{i}' for i in range(size)]
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(size)))
+    return vocabulary, cum_weights
+
+
+def write_corpus(path, posts, endpoint='hashtag', posts_per_file=60, carousel_rate=0.2,
+                 captionless_rate=0.1, heavy_hashtag_rate=0.1, seed=0):
+    """Write synthetic API pages to a directory.
+
+    Posts are spread over one year, newest first, like a crawl.
+
+    Args:
+        path (str): Output directory.
+        posts (int): Number of posts.
+        endpoint (str): 'hashtag' or 'location'. Defaults to 'hashtag'.
+        posts_per_file (int): Posts in each file. Defaults to 60.
+        carousel_rate (float): Share of carousel posts. Defaults to 0.2.
+        captionless_rate (float): Share of posts without a caption.
+            Defaults to 0.1.
+        heavy_hashtag_rate (float): Share of posts with the maximum
+            of 30 hashtags. Defaults to 0.1.
+        seed (int): Seed of the generator. Defaults to 0.
+
+    Returns:
+        list of Path: Written files.
+
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    vocabulary, cum_weights = hashtag_vocabulary()
+    interval = 365 * 24 * 3600 / max(1, posts)
+    files = []
+    for page, start in enumerate(range(0, posts, posts_per_file), start=1):
+        medias = []
+        for position in range(start, min(posts, start + posts_per_file)):
+            pk = 3 * 10 ** 18 - position
+            hashtags = MAX_HASHTAGS if rng.random() < heavy_hashtag_rate else rng.randint(0, 8)
+            medias.append(make_media(
+                pk, int(FIRST_TIMESTAMP - position * interval),
+                f'https://cdn.example.com/{pk}.jpg', rng, carousel_rate, captionless_rate,
+                hashtags, vocabulary, cum_weights))
+        next_max_id = str(page) if start + posts_per_file < posts else None
+        file_path = Path(path, f'{page}.json')
+        with open(file_path, 'w', encoding='utf8') as file:
+            json.dump(make_page(endpoint, medias, next_max_id), file)
+        files.append(file_path)
+    return files
+
+
+def write_categories(path, categories=20, hashtags_per_category=25, seed=0):
+    """Write a CSV file with custom categories of the synthetic hashtags.
+
+    Args:
+        path (str): Output file.
+        categories (int): Number of categories. Defaults to 20.
+        hashtags_per_category (int): Defaults to 25.
+        seed (int): Seed of the generator. Defaults to 0.
+
+    """
+    rng = random.Random(seed)
+    vocabulary, _ = hashtag_vocabulary()
+    with open(path, 'w', encoding='utf8') as file:
+        file.write('category,hashtags\n')
+        for i in range(categories):
+            tags = ', '.join('#' + tag for tag in rng.sample(vocabulary[:2000],
+                                                             hashtags_per_category))
+            file.write(f'category{i},"{tags}"\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--posts', default='10k',
+                        help=f"Number of posts or one of {', '.join(SIZES)}.")
+    parser.add_argument('--endpoint', choices=['hashtag', 'location'], default='hashtag')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    posts = SIZES.get(args.posts) or int(args.posts)
+    files = write_corpus(args.path, posts, args.endpoint, seed=args.seed)
+    print(f'{posts} posts written to {len(files)} files in {args.path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Local stand-in for the Instagram API and its image CDN.
+
+Serves synthetic pages of the hashtag and location endpoints with valid
+next_max_id chains, and JPEG images with support for Range requests.
+Latency, server errors and throttling can be injected to measure how
+the scrapers cope with them.
+
+    with FakeInstagramAPI(pages=5, error_rate=0.1) as api:
+        scraper = HashtagScraper('session', 'out').set_api_session()
+        scraper.extract_posts(api.hashtag_url('test'))
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+import zlib
+from .synthetic import make_jpeg, make_media, make_page
+
+PAGE_PATH = re.compile(r'/explore/(tags|locations)/([^/]+)/(?:[^/]+/)?')
+IMAGE_PATH = re.compile(r'/images/(\d+)\.jpg')
+ENDPOINTS = {'tags': 'hashtag', 'locations': 'location'}
+FIRST_TIMESTAMP = 1600000000
+
+
+class FakeInstagramAPI:
+    """HTTP server imitating the Instagram API in a background thread.
+
+    Post ids decrease from page to page, like on the real site, so the
+    incremental mode of the scrapers works against it.
+
+    Args:
+        pages (int): Number of pages of each hashtag or location.
+            Defaults to 10.
+        posts_per_page (int): Defaults to 60.
+        image_size (int): Size of the served images in bytes.
+            Defaults to 64 KiB.
+        latency (float): Delay in seconds before each response.
+            Defaults to 0.
+        error_rate (float): Probability of a 500 response. Defaults to 0.
+        throttle_rate (float): Probability of a 429 response.
+            Defaults to 0.
+        retry_after (float): Retry-After header sent with 429 responses,
+            None to omit it. Defaults to 0.
+        seed (int): Seed of the injected failures. Defaults to 0.
+
+    Attributes:
+        url (str): Address of the running server.
+        stats (Counter): Number of 'requests', 'pages', 'images',
+            'errors' and 'throttled' responses.
+
+    """
+
+    def __init__(self, pages=10, posts_per_page=60, image_size=64 * 1024, latency=0,
+                 error_rate=0, throttle_rate=0, retry_after=0, seed=0):
+        self.pages = pages
+        self.posts_per_page = posts_per_page
+        self.image_size = image_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self.url = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._image = make_jpeg(image_size)
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start serving on a free local port."""
+        api = self
+
+        class Handler(FakeAPIHandler):
+            server_api = api
+
+        self._server = FakeAPIServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def hashtag_url(self, hashtag):
+        """Url of a hashtag, as passed to the scrapers."""
+        return f'{self.url}/explore/tags/{hashtag}/'
+
+    def location_url(self, location_id, name='location'):
+        """Url of a location, as passed to the scrapers."""
+        return f'{self.url}/explore/locations/{location_id}/{name}/'
+
+    def page(self, endpoint, target, page):
+        """Build a page of a hashtag or location.
+
+        Args:
+            endpoint (str): 'hashtag' or 'location'.
+            target (str): Hashtag or location id.
+            page (int): Page number, starting from 0.
+
+        Returns:
+            dict: API response.
+
+        """
+        rng = random.Random(f'{endpoint}/{target}/{page}')
+        first_pk = (zlib.crc32(target.encode()) + 1) * 10 ** 9
+        medias = []
+        for i in range(self.posts_per_page):
+            position = page * self.posts_per_page + i
+            pk = first_pk - position
+            taken_at = FIRST_TIMESTAMP - position * 60
+            medias.append(make_media(pk, taken_at, f'{self.url}/images/{pk}.jpg', rng))
+        next_max_id = str(page + 1) if page + 1 < self.pages else None
+        return make_page(endpoint, medias, next_max_id)
+
+    def _failure(self):
+        """Helper method to draw an injected failure.
+
+        Returns:
+            int or None: Status code of the failure, None to respond normally.
+
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            draw = self._random.random()
+        if draw < self.error_rate:
+            return 500
+        if draw < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+    def _count(self, name):
+        """Helper method to count a response."""
+        with self._lock:
+            self.stats[name] += 1
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    """Threading HTTP server ignoring connections dropped by clients."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    """Request handler of FakeInstagramAPI."""
+
+    server_api = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        api = self.server_api
+        if api.latency:
+            time.sleep(api.latency)
+        status = api._failure()
+        if status == 500:
+            api._count('errors')
+            return self._respond(500, b'Internal Server Error')
+        if status == 429:
+            api._count('throttled')
+            headers = {} if api.retry_after is None else {'Retry-After': str(api.retry_after)}
+            return self._respond(429, b'Too Many Requests', headers=headers)
+
+        url = urlsplit(self.path)
+        page_match = PAGE_PATH.fullmatch(url.path)
+        image_match = IMAGE_PATH.fullmatch(url.path)
+        if page_match:
+            max_id = parse_qs(url.query).get('max_id', ['0'])[0]
+            content = api.page(ENDPOINTS[page_match[1]], page_match[2], int(max_id))
+            api._count('pages')
+            self._respond(200, json.dumps(content).encode('utf8'),
+                          content_type='application/json')
+        elif image_match:
+            api._count('images')
+            self._respond_image(api._image)
+        else:
+            self._respond(404, b'Not Found')
+
+    def _respond_image(self, image):
+        """Helper method to send an image, honouring a Range header."""
+        match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        offset = int(match[1]) if match else 0
+        if match and offset >= len(image):
+            self._respond(416, b'Range Not Satisfiable',
+                          headers={'Content-Range': f'bytes */{len(image)}'})
+        elif match:
+            self._respond(206, image[offset:], content_type='image/jpeg', headers={
+                'Content-Range': f'bytes {offset}-{len(image) - 1}/{len(image)}'})
+        else:
+            self._respond(200, image, content_type='image/jpeg')
+
+    def _respond(self, status, body, content_type='text/plain', headers=None):
+        """Helper method to send a complete response."""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,68 @@
+"""Import time of the package and the heavy dependencies it loads.
+
+Each statement is run in a fresh interpreter, the best of several runs
+is reported:
+
+    python -m benchmarks.imports --repeat 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+STATEMENTS = [
+    'import instatools',
+    'from instatools.scraping import HashtagScraper',
+    'from instatools.preprocessing import HashtagPosts',
+    'from instatools.preprocessing import HashtagPosts; HashtagPosts({}).to_df()',
+]
+HEAVY_MODULES = ['pandas', 'numpy', 'requests', 'dateutil', 'pyarrow']
+SCRIPT = """
+import sys
+from time import perf_counter
+start = perf_counter()
+{statement}
+seconds = perf_counter() - start
+print(seconds, ' '.join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def measure(statement, repeat=3):
+    """Measure the import time of a statement in fresh interpreters.
+
+    Args:
+        statement (str): Python code to run.
+        repeat (int): Number of runs, the best time is kept.
+
+    Returns:
+        dict: Statement, seconds and heavy modules it loaded.
+
+    """
+    best = None
+    for _ in range(max(1, repeat)):
+        output = subprocess.run(
+            [sys.executable, '-c', SCRIPT.format(statement=statement, modules=HEAVY_MODULES)],
+            check=True, capture_output=True, text=True).stdout.split()
+        seconds = float(output[0])
+        if best is None or seconds < best['seconds']:
+            best = {'statement': statement, 'seconds': round(seconds, 4),
+                    'loaded': output[1:]}
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+    args = parser.parse_args()
+    results = [measure(statement, args.repeat) for statement in STATEMENTS]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(f"{result['seconds']:>8.4f}s  {result['statement']}  "
+              f"[{', '.join(result['loaded'])}]")
+
+
+if __name__ == '__main__':
+    main()
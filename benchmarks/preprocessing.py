@@ -0,0 +1,191 @@
+"""Time and peak memory of the preprocessing pipeline on synthetic corpora.
+
+Corpora are generated once and kept in the data directory. Results can be
+saved and compared with a baseline to catch regressions:
+
+    python -m benchmarks.preprocessing --sizes 10k 100k --save baseline.json
+    python -m benchmarks.preprocessing --sizes 10k 100k --compare baseline.json
+"""
+import argparse
+import json
+from pathlib import Path
+import sys
+from time import perf_counter
+import tracemalloc
+from instatools.preprocessing import HashtagPosts
+from .corpus import SIZES, write_categories, write_corpus
+
+DATA_DIR = '.benchmarks'
+JUNK_HASHTAGS = ['#tag5', '#tag50', '#tag500']
+
+
+def measure(run, memory=False):
+    """Run a benchmark stage.
+
+    Args:
+        run (callable): Performs the stage.
+        memory (bool): Trace peak memory instead of measuring time,
+            as tracing slows down the stage. Defaults to False.
+
+    Returns:
+        tuple of float and object: Seconds or peak MiB, and the value
+            returned by run.
+
+    """
+    if memory:
+        tracemalloc.start()
+        value = run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return round(peak / 2 ** 20, 2), value
+    start = perf_counter()
+    value = run()
+    return round(perf_counter() - start, 4), value
+
+
+def corpus(size, data_dir=DATA_DIR):
+    """Generate a corpus unless it is already in the data directory.
+
+    Args:
+        size (str): One of SIZES.
+        data_dir (str): Directory keeping the corpora.
+
+    Returns:
+        Path: Directory with the JSON files.
+
+    """
+    path = Path(data_dir, f'corpus-{size}')
+    if not Path(path, '1.json').exists():
+        write_corpus(path, SIZES[size])
+    return path
+
+
+def run_stages(path, categories_path, workers, memory=False):
+    """Run all stages of preprocessing on a corpus.
+
+    Args:
+        path (str): Directory with the JSON files.
+        categories_path (str): CSV file with custom categories.
+        workers (int): Processes used by the parallel parsing stage.
+        memory (bool): Trace peak memory instead of measuring time.
+
+    Returns:
+        dict: Seconds or peak MiB of each stage.
+
+    """
+    nodes = HashtagPosts._extract_edges_from_json(Path(path, '1.json'))
+    results = dict()
+    # pandas is imported on first use, keep the import out of the to_df stage
+    HashtagPosts({}).to_df()
+
+    def stage(name, run):
+        results[name], value = measure(run, memory)
+        return value
+
+    stage('extract_post', lambda: [HashtagPosts._extract_post(node)
+                                   for _ in range(100) for node in nodes])
+    posts = stage('from_json_files', lambda: HashtagPosts.from_json_files(path))
+    stage('from_json_files_workers', lambda: HashtagPosts.from_json_files(path, workers=workers))
+    stage('index', lambda: posts.index)
+    stage('remove_posts', lambda: posts.remove_posts(JUNK_HASHTAGS))
+    stage('set_custom_categories', lambda: posts.set_custom_categories(categories_path))
+    stage('popular_hashtags', lambda: posts.popular_hashtags(100))
+    stage('popular_categories', lambda: posts.popular_categories())
+    stage('to_df', lambda: posts.to_df())
+    stage('to_df_compact', lambda: posts.to_df(compact=True))
+    return results
+
+
+def run_benchmark(sizes=('10k',), data_dir=DATA_DIR, workers=4, memory=True, repeat=1):
+    """Benchmark the stages of preprocessing.
+
+    Time is measured first, then the stages are repeated with
+    tracemalloc to find their peak memory.
+
+    Args:
+        sizes (list): Corpus sizes, keys of SIZES.
+        data_dir (str): Directory keeping the corpora.
+        workers (int): Processes used by the parallel parsing stage.
+        memory (bool): Trace peak memory of each stage.
+        repeat (int): Number of timed runs, the best time is kept.
+
+    Returns:
+        list of dict: Results of each stage.
+
+    """
+    categories_path = Path(data_dir, 'categories.csv')
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    write_categories(categories_path)
+    results = []
+    for size in sizes:
+        path = corpus(size, data_dir)
+        runs = [run_stages(path, categories_path, workers) for _ in range(max(1, repeat))]
+        seconds = {stage: min(run[stage] for run in runs) for stage in runs[0]}
+        peaks = run_stages(path, categories_path, workers, memory=True) if memory else {}
+        results.extend({'stage': stage, 'size': size, 'seconds': value,
+                        'peak_mib': peaks.get(stage)}
+                       for stage, value in seconds.items())
+    return results
+
+
+def compare(results, baseline, threshold=1.25, min_seconds=0.05):
+    """Find stages slower than in the baseline.
+
+    Args:
+        results (list of dict): Current results.
+        baseline (list of dict): Saved results.
+        threshold (float): Allowed ratio of current to baseline time.
+        min_seconds (float): Smaller slowdowns are treated as noise.
+
+    Returns:
+        list of str: Descriptions of the regressions.
+
+    """
+    previous = {(result['stage'], result['size']): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['stage'], result['size']))
+        if before is None:
+            continue
+        slowdown = result['seconds'] - before['seconds']
+        if result['seconds'] > before['seconds'] * threshold and slowdown > min_seconds:
+            regressions.append(f"{result['stage']} ({result['size']}): "
+                               f"{before['seconds']}s -> {result['seconds']}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['10k'])
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip the second run tracing peak memory.')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Number of timed runs, the best time is kept.')
+    parser.add_argument('--save', help='Save results to a JSON file.')
+    parser.add_argument('--compare', help='Compare with results saved in a JSON file.')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.data_dir, args.workers, not args.no_memory,
+                            args.repeat)
+    columns = list(results[0])
+    print('  '.join(f'{column:>24}' for column in columns))
+    for result in results:
+        print('  '.join(f'{str(result[column]):>24}' for column in columns))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf8') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf8') as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Throughput benchmark of the scrapers against the local API stand-in.
+
+Reports pages/sec for HashtagScraper and AsyncScraper, images/sec for
+extract_images and the retry overhead caused by injected failures:
+
+    python -m benchmarks.scraping --pages 20 --workers 8 --error-rate 0.05
+"""
+import argparse
+import json
+from pathlib import Path
+import tempfile
+from time import perf_counter
+from instatools.scraping import AsyncScraper, HashtagScraper, RateLimiter
+from instatools.preprocessing import HashtagPosts
+from .fakeapi import FakeInstagramAPI
+
+
+def measure(api, name, run):
+    """Run a benchmark stage and summarise the traffic it caused.
+
+    Args:
+        api (FakeInstagramAPI): Server used by the stage.
+        name (str): Stage name.
+        run (callable): Performs the stage, returns the number of
+            retrieved items and the scraper used.
+
+    Returns:
+        dict: Results of the stage.
+
+    """
+    before = api.stats.copy()
+    start = perf_counter()
+    items, scraper = run()
+    summary = scraper.metrics.summary()
+    elapsed = perf_counter() - start
+    stats = api.stats - before
+    failed = stats['errors'] + stats['throttled']
+    useful = stats['requests'] - failed
+    return {
+        'stage': name,
+        'items': items,
+        'seconds': round(elapsed, 3),
+        'items_per_second': round(items / elapsed, 2) if elapsed else None,
+        'requests': stats['requests'],
+        'retries': failed,
+        'retry_overhead': round(failed / useful, 3) if useful else None,
+        'latency_p95': round(summary['latency']['p95'] or 0, 4),
+        'backoff_seconds': round(summary['waited_seconds'], 3),
+    }
+
+
+def run_benchmark(pages=10, posts_per_page=60, targets=4, workers=8, image_size=64 * 1024,
+                  images=200, latency=0.0, error_rate=0.0, throttle_rate=0.0,
+                  backoff=0.05, max_backoff=1):
+    """Benchmark the scrapers against a local API stand-in.
+
+    Args:
+        pages (int): Pages of each hashtag.
+        posts_per_page (int): Posts on each page.
+        targets (int): Number of hashtags crawled concurrently by AsyncScraper.
+        workers (int): Concurrent requests of AsyncScraper and extract_images.
+        image_size (int): Size of the images in bytes.
+        images (int): Maximum number of images to download.
+        latency (float): Server delay in seconds.
+        error_rate (float): Probability of a 500 response.
+        throttle_rate (float): Probability of a 429 response.
+        backoff (float): Base pause of the rate limiter after a failure.
+        max_backoff (float): Longest pause of the rate limiter.
+
+    Returns:
+        list of dict: Results of each stage.
+
+    """
+    def session(scraper):
+        return scraper.set_api_session(
+            timeout=10, max_retries=0, throttle_retries=10,
+            rate_limiter=RateLimiter(rate=None, backoff=backoff, max_backoff=max_backoff))
+
+    results = []
+    with FakeInstagramAPI(pages, posts_per_page, image_size, latency, error_rate,
+                          throttle_rate) as api, tempfile.TemporaryDirectory() as path:
+        posts = HashtagPosts({})
+
+        def crawl():
+            scraper = session(HashtagScraper('benchmark', Path(path, 'serial')))
+            scraper.extract_posts(api.hashtag_url('serial'), sink=posts.update)
+            return scraper.metrics.summary()['pages'], scraper
+
+        def crawl_async():
+            scraper = session(AsyncScraper('benchmark', Path(path, 'async'),
+                                           max_concurrency=workers, delay=0))
+            scraper.extract_posts([api.hashtag_url(f'async{i}') for i in range(targets)])
+            return scraper.metrics.summary()['pages'], scraper
+
+        def download():
+            scraper = session(HashtagScraper('benchmark', Path(path, 'images')))
+            selected = dict(list(posts.posts.items())[:images])
+            report = scraper.extract_images(selected, workers=workers)
+            return report['succeeded'], scraper
+
+        results.append(measure(api, 'pages', crawl))
+        results.append(measure(api, 'pages_async', crawl_async))
+        results.append(measure(api, 'images', download))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--posts-per-page', type=int, default=60)
+    parser.add_argument('--targets', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--image-size', type=int, default=64 * 1024)
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.pages, args.posts_per_page, args.targets, args.workers,
+                            args.image_size, args.images, args.latency, args.error_rate,
+                            args.throttle_rate)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print('  '.join(f'{column:>16}' for column in columns))
+    for result in results:
+        print('  '.join(f'{str(result[column]):>16}' for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Synthetic Instagram API responses.
+
+The pages follow the structure of the hashtag and location endpoints,
+so they are parsed by the scrapers and Posts like real responses.
+"""
+import random
+import string
+
+JPEG_START = b'\xff\xd8\xff\xe0'
+JPEG_END = b'\xff\xd9'
+JSON_FIELDS = {'hashtag': 'data', 'location': 'native_location_data'}
+MEDIAS_PER_SECTION = 3
+CANDIDATE_WIDTHS = (1080, 750, 640, 480, 320, 240, 150)
+
+
+def make_media(pk, taken_at, image_url, rng, carousel_rate=0.2, captionless_rate=0.1,
+               hashtags=None, vocabulary=None, cum_weights=None):
+    """Create a single post as returned by the API.
+
+    Args:
+        pk (int): Post id.
+        taken_at (int): Timestamp in seconds since the epoch.
+        image_url (str): Url of the image.
+        rng (random.Random): Source of randomness.
+        carousel_rate (float): Probability of a carousel post.
+        captionless_rate (float): Probability of a post without a caption.
+        hashtags (int): Number of hashtags in the caption. Defaults to
+            a random number between 0 and 10.
+        vocabulary (list): Hashtags to draw from, without '#'.
+        cum_weights (list): Cumulative weights of the vocabulary.
+            Defaults to equal weights.
+
+    Returns:
+        dict: A media node.
+
+    """
+    vocabulary = vocabulary or [f'tag{i}' for i in range(100)]
+    user_pk = rng.randrange(1, 10 ** 6)
+    candidates = [{'width': width, 'height': width,
+                   'url': image_url if i == 0 else f'{image_url}?size={width}'}
+                  for i, width in enumerate(CANDIDATE_WIDTHS)]
+    media = {
+        'taken_at': taken_at,
+        'pk': pk,
+        'id': f'{pk}_{user_pk}',
+        'code': ''.join(rng.choices(string.ascii_letters + string.digits, k=11)),
+        'user': {'pk': user_pk, 'username': f'user{user_pk}',
+                 'full_name': f'User {user_pk}'},
+        'like_count': int(rng.paretovariate(1.2)) - 1,
+        'comment_count': int(rng.paretovariate(1.5)) - 1,
+        'caption': None,
+    }
+    if rng.random() < carousel_rate:
+        media['media_type'] = 8
+        media['carousel_media'] = [{'media_type': 1, 'image_versions2': {'candidates': candidates}}
+                                   for _ in range(rng.randint(2, 10))]
+    else:
+        media['media_type'] = 1
+        media['image_versions2'] = {'candidates': candidates}
+    if rng.random() >= captionless_rate:
+        if hashtags is None:
+            hashtags = rng.randint(0, 10)
+        tags = ' '.join('#' + tag for tag in rng.choices(
+            vocabulary, cum_weights=cum_weights, k=hashtags))
+        media['caption'] = {'text': f'Post {pk} {tags}'.strip()}
+    return {'media': media}
+
+
+def make_page(endpoint, medias, next_max_id=None):
+    """Wrap posts in an API page.
+
+    Args:
+        endpoint (str): 'hashtag' or 'location'.
+        medias (list): Media nodes.
+        next_max_id (str): Cursor of the next page, None for the last one.
+
+    Returns:
+        dict: API response.
+
+    """
+    sections = [{'layout_type': 'media_grid',
+                 'layout_content': {'medias': medias[i:i + MEDIAS_PER_SECTION]}}
+                for i in range(0, len(medias), MEDIAS_PER_SECTION)]
+    recent = {'sections': sections, 'more_available': next_max_id is not None,
+              'next_max_id': next_max_id}
+    return {JSON_FIELDS[endpoint]: {'recent': recent}}
+
+
+def make_jpeg(size, rng=None):
+    """Create bytes that pass as a complete JPEG image.
+
+    Args:
+        size (int): Size in bytes.
+        rng (random.Random): Source of randomness. Defaults to None.
+
+    Returns:
+        bytes: Image content.
+
+    """
+    rng = rng or random.Random(size)
+    body = max(0, size - len(JPEG_START) - len(JPEG_END))
+    content = rng.getrandbits(8 * body).to_bytes(body, 'little') if body else b''
+    return JPEG_START + content + JPEG_END
@@ -8,7 +8,29 @@ and preprocessing of data from Instagram API
 __author__ = """karolow"""
 __version__ = "0.1.0"
 
-from . import (
-    preprocessing,
-    scraping,
-)
+import importlib
+
+# Submodules and their classes are imported on first use, so that
+# scraping does not load pandas and preprocessing does not load requests.
+SUBMODULES = ('preprocessing', 'scraping')
+ATTRIBUTES = {
+    'HashtagPosts': 'preprocessing',
+    'LocationPosts': 'preprocessing',
+    'HashtagScraper': 'scraping',
+    'LocationScraper': 'scraping',
+    'Scraper': 'scraping',
+}
+
+__all__ = list(SUBMODULES) + list(ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    if name in ATTRIBUTES:
+        return getattr(importlib.import_module(f'.{ATTRIBUTES[name]}', __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
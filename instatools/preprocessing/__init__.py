@@ -1,4 +1,23 @@
-from .preprocessing import (
-    HashtagPosts,
-    LocationPosts
-)
+import importlib
+
+# Classes are imported from their modules on first use.
+ATTRIBUTES = {
+    'HashtagPosts': 'preprocessing',
+    'LocationPosts': 'preprocessing',
+    'PostsQuery': 'query',
+    'PostsStore': 'store',
+    'SpaceSaving': 'sketches',
+    'TimeIndex': 'timeindex',
+}
+
+__all__ = list(ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in ATTRIBUTES:
+        return getattr(importlib.import_module(f'.{ATTRIBUTES[name]}', __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,95 @@
+from collections import Counter
+
+
+class HashtagIndex:
+    """
+    Inverted index of hashtags to the posts using them.
+
+    Args:
+        posts (dict): Collection of posts to index. Defaults to None.
+
+    Attributes:
+        ids (dict): Mapping of hashtags to sets of post ids.
+        counts (Counter): Number of occurrences of each hashtag.
+
+    """
+
+    def __init__(self, posts=None):
+        self.ids = dict()
+        self.counts = Counter()
+        for id, post in (posts or {}).items():
+            self.add(id, post.get('hashtags'))
+
+    def __repr__(self):
+        return f'Index of {len(self.ids)} hashtags'
+
+    def add(self, id, hashtags):
+        """Add a post to the index.
+
+        Args:
+            id (str): Post id.
+            hashtags (list): Hashtags of the post.
+
+        """
+        if not hashtags:
+            return
+        self.counts.update(hashtags)
+        for tag in hashtags:
+            self.ids.setdefault(tag, set()).add(id)
+
+    def remove(self, id, hashtags):
+        """Remove a post from the index.
+
+        Args:
+            id (str): Post id.
+            hashtags (list): Hashtags of the post.
+
+        """
+        if not hashtags:
+            return
+        self.counts.subtract(hashtags)
+        for tag in hashtags:
+            if self.counts[tag] <= 0:
+                del self.counts[tag]
+            ids = self.ids.get(tag)
+            if ids is not None:
+                ids.discard(id)
+                if not ids:
+                    del self.ids[tag]
+
+    def any(self, hashtags):
+        """Find posts with any of the hashtags.
+
+        Args:
+            hashtags (list): Hashtags to search for.
+
+        Returns:
+            set: Post ids.
+
+        """
+        found = set()
+        for tag in hashtags:
+            found.update(self.ids.get(tag, ()))
+        return found
+
+    def all(self, hashtags):
+        """Find posts with all of the hashtags.
+
+        Args:
+            hashtags (list): Hashtags to search for.
+
+        Returns:
+            set: Post ids.
+
+        """
+        matches = sorted((self.ids.get(tag, set()) for tag in set(hashtags)), key=len)
+        if not matches:
+            return set()
+        return matches[0].intersection(*matches[1:])
+
+    def copy(self):
+        """Create an independent copy of the index."""
+        index = HashtagIndex()
+        index.ids = {tag: set(ids) for tag, ids in self.ids.items()}
+        index.counts = self.counts.copy()
+        return index
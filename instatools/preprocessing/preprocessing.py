@@ -1,11 +1,30 @@
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import csv
+import gzip
 from datetime import datetime
-from dateutil import tz
 import json
+import os
 from pathlib import Path
 import re
-import pandas as pd
+import zlib
+from .index import HashtagIndex
+from .query import PostsQuery
+from .sketches import DEFAULT_CAPACITY, SpaceSaving
+from .timeindex import TimeIndex
+from .store import PostsStore
+
+CACHE_FILE = '.posts_cache.gz'
+CACHE_VERSION = 2
+PARTITIONS = {'date': 10, 'month': 7}
+COMPACT_DTYPES = {
+    'user_id': 'int64',
+    'user_name': 'category',
+    'user_full_name': 'category',
+    'timestamp': 'datetime64[ns]',
+    'likes': 'int64',
+    'comments': 'int64',
+}
 
 
 class Posts:
@@ -19,15 +38,31 @@ class Posts:
         posts (dict): Collection of posts obtained from Instagram API.
         df (Pandas dataframe): Collection of posts converted to dataframe.
         hashes (list): A list of lists with all existing hashtags.
+        index (HashtagIndex): Inverted index of hashtags to posts.
+        time_index (TimeIndex): Sorted index of post timestamps.
 
     Methods:
         to_hashes: Generate a list of lists with all existing hashtags.
         to_df: Convert posts to Pandas dataframe.
+        concat: Merge many objects containing Instagram posts.
         from_json_files: Create a class from multiple JSON files.
+        iter_json_files: Lazily parse posts from multiple JSON files.
+        from_sqlite: Create a class from posts saved in a SQLite database.
+        to_sqlite: Save posts to a SQLite database.
+        from_parquet: Create a class from posts saved in Parquet files.
+        to_parquet: Save posts to Parquet files.
         set_custom_categories: Assign posts to categories based on
             existing hashtags.
         popular_categories: Check the popularity of categories.
         popular_hashtags: Find the most popular hashtags.
+        popular_categories_over_time: Check the popularity of categories
+            in consecutive periods of time.
+        popular_hashtags_over_time: Find the most popular hashtags
+            in consecutive periods of time.
+        select_posts: Select posts with any or all of the given hashtags.
+        where: Lazily select posts meeting all conditions.
+        sketch: Approximately count values in bounded memory.
+        sketch_json_files: Approximately count values in JSON files.
 
     """
 
@@ -35,6 +70,8 @@ class Posts:
         self.posts = posts
         self.df = None
         self.hashes = None
+        self._index = None
+        self._time_index = None
 
     def __repr__(self):
         return f'{len(self.posts)} Instagram posts'
@@ -42,63 +79,638 @@ class Posts:
     def __add__(self, other):
         """Add an object to another one of the same base class.
 
-        They can also be added using the "+" operator.
+        They can also be added using the "+" operator. Posts of the other
+        object replace duplicated ones.
 
         Args:
             other: Another object containg Instagram posts.
 
         Returns:
             A new instance of Posts class containg the posts
-            from two other objects.
+            from two other objects. The class is kept if both
+            objects share it.
 
         """
-        return Posts({**self.posts, **other.posts})
+        return Posts.concat([self, other])
+
+    def __iadd__(self, other):
+        """Add posts of another object in place, using the "+=" operator.
+
+        Posts of the other object replace duplicated ones. The index and
+        the df attribute, if present, are updated instead of rebuilt.
+        The df attribute becomes compact if either object has a compact one.
+
+        Args:
+            other: Another object containg Instagram posts.
+
+        Returns:
+            The updated object.
+
+        """
+        for id, post in other.posts.items():
+            previous = self.posts.get(id)
+            if self._index is not None:
+                if previous is not None:
+                    self._index.remove(id, previous['hashtags'])
+                self._index.add(id, post['hashtags'])
+            if self._time_index is not None:
+                if previous is not None:
+                    self._time_index.remove(id, previous['timestamp'])
+                self._time_index.add(id, post['timestamp'])
+            self.posts[id] = post
+
+        if self.df is not None and other.posts:
+            import pandas as pd
+            other_df = other.df if other.df is not None else Posts(other.posts).to_df().df
+            compact = self._is_compact(self.df) or self._is_compact(other_df)
+            if compact and not self._is_compact(self.df):
+                self._compact_df(self.df)
+            if compact and not self._is_compact(other_df):
+                other_df = self._compact_df(other_df.copy())
+            kept = ~self.df.index.isin(self._frame_ids(self.df, other.posts))
+            self.df = pd.concat([self.df[kept], other_df])
+            if compact:
+                self._compact_df(self.df)
+        self.hashes = None
+        return self
+
+    @classmethod
+    def concat(cls, collections, keep='last'):
+        """Merge many objects containing Instagram posts in a single pass.
+
+        The index is carried over from the first object and updated with
+        the others. The df attribute is merged if all objects have it.
+
+        Args:
+            collections (list): Objects containing Instagram posts.
+            keep (str): Which of duplicated posts to keep, 'last' as with
+                the "+" operator or 'first' as in from_json_files.
+                Defaults to 'last'.
+
+        Returns:
+            A new object with all posts. Its class is shared by
+            all collections or Posts otherwise.
+
+        """
+        if keep not in ('first', 'last'):
+            raise ValueError(f"keep must be 'first' or 'last', not {keep!r}")
+        collections = list(collections)
+        classes = {type(collection) for collection in collections}
+        result_cls = classes.pop() if len(classes) == 1 else cls
+
+        posts = dict()
+        index = collections[0].index.copy() if (
+            collections and collections[0]._index is not None) else None
+        for i, collection in enumerate(collections):
+            if i == 0:
+                posts.update(collection.posts)
+                continue
+            for id, post in collection.posts.items():
+                previous = posts.get(id)
+                if previous is not None and keep == 'first':
+                    continue
+                if index is not None:
+                    if previous is not None:
+                        index.remove(id, previous['hashtags'])
+                    index.add(id, post['hashtags'])
+                posts[id] = post
+
+        result = result_cls(posts)
+        result._index = index
+        if collections and all(collection.df is not None for collection in collections):
+            import pandas as pd
+            frames = [collection.df for collection in collections]
+            compact = any(cls._is_compact(df) for df in frames)
+            if compact:
+                frames = [df if cls._is_compact(df) else cls._compact_df(df.copy())
+                          for df in frames]
+            df = pd.concat(frames)
+            df = df[~df.index.duplicated(keep=keep)].reindex(cls._frame_ids(df, posts))
+            result.df = cls._compact_df(df) if compact else df
+        return result
+
+    @property
+    def index(self):
+        """HashtagIndex: Inverted index of hashtags, built on first use.
+
+        It is kept up to date by the methods of the class, so the posts
+        should not be modified directly once the index is built.
+
+        """
+        if self._index is None:
+            self._index = HashtagIndex(self.posts)
+        return self._index
+
+    @property
+    def time_index(self):
+        """TimeIndex: Sorted index of post timestamps, built on first use.
+
+        Like the index of hashtags, it is kept up to date by the methods
+        of the class.
+
+        """
+        if self._time_index is None:
+            self._time_index = TimeIndex(self.posts)
+        return self._time_index
+
+    def update(self, posts):
+        """Add posts to the collection, e.g. as they are scraped.
+
+        Posts already in the collection are not replaced. The indexes and
+        the df attribute, if present, are updated.
+
+        Args:
+            posts (iterable): Post ids and contents.
+
+        """
+        added = dict()
+        for id, post in posts:
+            if id not in self.posts and id not in added:
+                added[id] = post
+        self.posts.update(added)
+        if self._index is not None:
+            for id, post in added.items():
+                self._index.add(id, post['hashtags'])
+        if self._time_index is not None:
+            for id, post in added.items():
+                self._time_index.add(id, post['timestamp'])
+        if self.df is not None and added:
+            import pandas as pd
+            compact = self._is_compact(self.df)
+            self.df = pd.concat([self.df, type(self)(added).to_df(compact=compact).df])
+            if compact:
+                self._compact_df(self.df)
+        self.hashes = None
+        return self
 
     def to_hashes(self):
         """Generate a list of lists with all existing hashtags."""
         self.hashes = [v['hashtags'] for k, v in self.posts.items() if v['hashtags']]
         return self
 
-    def to_df(self):
-        """Convert posts to Pandas dataframe."""
-        self.df = pd.DataFrame.from_dict(self.posts, orient='index')
+    def to_df(self, compact=False):
+        """Convert posts to Pandas dataframe.
+
+        The dataframe is built column by column. In the compact mode
+        ids become integers, timestamps become datetimes, counts become
+        integers and user names become categoricals. Texts, urls and
+        hashtag lists still take most of the memory, so the dataframe
+        is only slightly smaller; use to_long_df or to_sparse_df for
+        hashtags and categories. The compact types are kept when the
+        collection is updated or merged.
+
+        Args:
+            compact (bool): Convert columns to compact types.
+                Defaults to False.
+
+        """
+        import pandas as pd
+        records = self.posts.values()
+        names = dict()
+        for record in records:
+            names.update(dict.fromkeys(record))
+        columns = {name: [record.get(name) for record in records] for name in names}
+        self.df = pd.DataFrame(columns, index=list(self.posts))
+        if compact:
+            self._compact_df(self.df)
         return self
 
+    @staticmethod
+    def _compact_df(df):
+        """Helper method to convert a dataframe to compact types in place.
+
+        Args:
+            df (Pandas dataframe): Posts indexed by their ids.
+
+        Returns:
+            Pandas dataframe: The converted dataframe.
+
+        """
+        import pandas as pd
+        df.index = df.index.astype('int64')
+        for name in df.columns.intersection(COMPACT_DTYPES):
+            dtype = COMPACT_DTYPES[name]
+            if dtype == 'datetime64[ns]':
+                df[name] = pd.to_datetime(df[name])
+            elif dtype == 'int64' and df[name].isna().any():
+                df[name] = df[name].astype('Int64')
+            else:
+                df[name] = df[name].astype(dtype)
+        return df
+
+    @staticmethod
+    def _is_compact(df):
+        """Helper method to check if a dataframe was created in the compact mode."""
+        import pandas as pd
+        return pd.api.types.is_integer_dtype(df.index)
+
+    @classmethod
+    def _frame_ids(cls, df, ids):
+        """Helper method to convert post ids to the type of a dataframe index.
+
+        Args:
+            df (Pandas dataframe): Posts indexed by their ids.
+            ids (iterable): Post ids, as in the posts attribute.
+
+        Returns:
+            list: Ids matching the index of the dataframe.
+
+        """
+        if cls._is_compact(df):
+            return [int(id) for id in ids]
+        return list(ids)
+
+    def to_long_df(self, column='hashtags'):
+        """Convert a list variable to a dataframe with one row per value.
+
+        Args:
+            column (str): Variable name, e.g. 'hashtags' or 'categories'.
+                Defaults to 'hashtags'.
+
+        Returns:
+            Pandas dataframe: Post ids and categorical values.
+
+        """
+        import pandas as pd
+        ids = []
+        values = []
+        for id, post in self.posts.items():
+            for value in post.get(column) or ():
+                ids.append(id)
+                values.append(value)
+        return pd.DataFrame({'id': ids, column: pd.Categorical(values)})
+
+    def to_sparse_df(self, column='hashtags'):
+        """Convert a list variable to a sparse dataframe of indicators.
+
+        Args:
+            column (str): Variable name, e.g. 'hashtags' or 'categories'.
+                Defaults to 'hashtags'.
+
+        Returns:
+            Pandas dataframe: One sparse column per value, indexed by post ids.
+
+        """
+        import pandas as pd
+        long_df = self.to_long_df(column).drop_duplicates()
+        dummies = pd.get_dummies(long_df[column], sparse=True, dtype='uint8')
+        dummies.index = long_df['id']
+        return dummies.groupby(level=0, sort=False).max().reindex(
+            list(self.posts), fill_value=0).astype(pd.SparseDtype('uint8', 0))
+
     @classmethod
-    def from_json_files(cls, path):
+    def from_json_files(cls, path, workers=None, cache=False):
         """
         Create a class from multiple JSON files.
 
+        Files are parsed in their natural order (e.g. 2.json before 10.json)
+        and the first occurrence of a duplicated post is kept.
+
         Args:
             path (str): A path to directory with JSON files obtained from API.
+            workers (int): Number of processes parsing the files in parallel.
+                Files are parsed in the current process if None.
+                Defaults to None.
+            cache (bool or str): Keep parsed posts in a gzip compressed JSON
+                cache file, so that only new or modified files are parsed
+                next time. If True, the cache is stored in the directory with
+                JSON files, otherwise in the given file. Defaults to False.
 
         """
-        files = Path(path).glob('**/*.json')
-        posts = dict()
+        if not workers and not cache:
+            return cls(dict(cls.iter_json_files(path)))
+
+        files = cls._find_json_files(path)
+        cache_path = Path(path, CACHE_FILE) if cache is True else cache
+        cached = cls._load_cache(cache_path) if cache else dict()
+
+        keys = {file: file.relative_to(path).as_posix() for file in files}
+        stats = {file: file.stat() for file in files}
+        stale = [file for file in files
+                 if not cls._is_cached(cached.get(keys[file]), stats[file])]
+        parsed = dict(zip(stale, cls._parse_json_files(stale, workers)))
+        contents = {file: parsed[file] if file in parsed else cached[keys[file]]['posts']
+                    for file in files}
 
+        posts = dict()
         for file in files:
-            edges = cls._extract_edges_from_json(file)
-            for node in edges:
-                id, content = cls._extract_post(node)
-                posts.setdefault(id, content)
+            for id, record in contents[file]:
+                posts.setdefault(id, record)
+
+        if cache and (parsed or len(cached) != len(files)):
+            entries = {keys[file]: {'size': stats[file].st_size,
+                                    'mtime': stats[file].st_mtime_ns,
+                                    'posts': contents[file]}
+                       for file in files}
+            cls._save_cache(cache_path, entries)
 
         return cls(posts)
 
+    @classmethod
+    def _parse_json_files(cls, files, workers=None):
+        """
+        Helper method to parse posts from JSON files, optionally in parallel.
+
+        Args:
+            files (list): JSON files to parse.
+            workers (int): Number of processes. Defaults to None.
+
+        Returns:
+            list: Post ids and contents of each file, in the order of files.
+
+        """
+        if not workers or not files:
+            return [cls._extract_posts_from_json(file) for file in files]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(files) // (workers * 4))
+            return list(executor.map(cls._extract_posts_from_json, files, chunksize=chunksize))
+
+    @staticmethod
+    def _is_cached(entry, stat):
+        """
+        Helper method to check if a file is unchanged since it was cached.
+
+        Args:
+            entry (dict): Cache entry of the file, None if missing.
+            stat (os.stat_result): Current status of the file.
+
+        Returns:
+            bool: True if the cached content is up to date.
+
+        """
+        return (entry is not None and entry['size'] == stat.st_size
+                and entry['mtime'] == stat.st_mtime_ns)
+
+    @classmethod
+    def _load_cache(cls, cache_path):
+        """
+        Helper method to load cached posts.
+
+        Args:
+            cache_path (str): A path to the cache file.
+
+        Returns:
+            dict: Cache entries per source file, empty if the cache
+                is missing, unreadable, outdated or created by another class.
+
+        """
+        try:
+            with gzip.open(cache_path, 'rt', encoding='utf8') as file:
+                cache = json.load(file)
+        except (OSError, EOFError, ValueError, zlib.error):
+            return dict()
+        if (not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION
+                or cache.get('json_field') != cls.JSON_FIELD):
+            return dict()
+        return cache['files']
+
+    @classmethod
+    def _save_cache(cls, cache_path, entries):
+        """
+        Helper method to atomically save cached posts.
+
+        Args:
+            cache_path (str): A path to the cache file.
+            entries (dict): Cache entries per source file.
+
+        """
+        temp_path = Path(str(cache_path) + '.tmp')
+        with gzip.open(temp_path, 'wt', encoding='utf8', compresslevel=1) as file:
+            json.dump({'version': CACHE_VERSION, 'json_field': cls.JSON_FIELD,
+                       'files': entries}, file, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+
+    @classmethod
+    def from_sqlite(cls, path):
+        """
+        Create a class from posts saved in a SQLite database.
+
+        Args:
+            path (str): A path to the database created with to_sqlite
+                or PostsStore.
+
+        """
+        with PostsStore(path) as store:
+            return cls(dict(store.iter_posts()))
+
+    def to_sqlite(self, path, replace=True):
+        """Save posts to a SQLite database.
+
+        Posts already in the database are updated. See PostsStore for
+        analysing the database without loading it.
+
+        Args:
+            path (str): A path to the database file.
+            replace (bool): Replace the content of existing posts if True,
+                otherwise keep their first version. Defaults to True.
+
+        """
+        with PostsStore(path) as store:
+            store.upsert(self.posts.items(), replace)
+        return self
+
+    @classmethod
+    def from_parquet(cls, path, columns=None, filters=None):
+        """
+        Create a class from posts saved in Parquet files.
+
+        Only the selected columns and the partitions or row groups matching
+        the filters are read. Requires the pyarrow package.
+
+        Args:
+            path (str): A path to the directory created with to_parquet.
+            columns (list): Variables to read, all if None. Defaults to None.
+            filters (list): Filters in the pyarrow format, e.g.
+                [('month', '=', '2021-05')] or
+                [('timestamp', '>=', datetime(2021, 5, 1))]. Defaults to None.
+
+        """
+        pq = cls._import_parquet()
+        if columns is not None:
+            columns = ['id'] + [column for column in columns if column != 'id']
+        table = pq.read_table(path, columns=columns, filters=filters)
+        table = table.drop([name for name in PARTITIONS if name in table.column_names])
+
+        posts = dict()
+        for record in table.to_pylist():
+            id = record.pop('id')
+            if record.get('timestamp') is not None:
+                record['timestamp'] = record['timestamp'].isoformat()
+            posts[id] = record
+        return cls(posts)
+
+    def to_parquet(self, path, partition_by='month'):
+        """Save posts to Parquet files.
+
+        Hashtags and categories are stored as list columns. Files are
+        partitioned by date, which makes it possible to read only
+        the selected periods. Existing partitions with new posts are
+        replaced. Requires the pyarrow package.
+
+        Args:
+            path (str): A path to the output directory.
+            partition_by (str): 'date', 'month' or None to store
+                all posts together. Defaults to 'month'.
+
+        """
+        import pandas as pd
+        pq = self._import_parquet()
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        records = self.posts.values()
+        names = dict()
+        for record in records:
+            names.update(dict.fromkeys(record))
+        columns = {'id': list(self.posts)}
+        columns.update({name: [record.get(name) for record in records] for name in names})
+        timestamps = columns.get('timestamp', [None] * len(self.posts))
+        if 'timestamp' in columns:
+            columns['timestamp'] = pd.to_datetime(pd.Series(timestamps, dtype=object))
+        if partition_by is not None:
+            length = PARTITIONS[partition_by]
+            columns[partition_by] = [timestamp[:length] if timestamp else None
+                                     for timestamp in timestamps]
+
+        table = pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False)
+        if partition_by is None:
+            Path(path).mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, Path(path, 'posts.parquet'))
+        else:
+            ds.write_dataset(table, path, format='parquet',
+                             partitioning=[partition_by], partitioning_flavor='hive',
+                             existing_data_behavior='delete_matching')
+        return self
+
+    @staticmethod
+    def _import_parquet():
+        """Helper method to import the optional pyarrow package."""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError(
+                'Parquet support requires pyarrow: pip install instagramtools[parquet]'
+            ) from error
+        return pq
+
+    @classmethod
+    def iter_json_files(cls, path, unique=True):
+        """
+        Lazily parse posts from multiple JSON files.
+
+        Only one file is held in memory at a time, which makes it possible
+        to process collections that do not fit in memory.
+
+        Args:
+            path (str): A path to directory with JSON files obtained from API.
+            unique (bool): Skip repeated occurrences of a post. Only ids
+                of the yielded posts are kept in memory. Defaults to True.
+
+        Yields:
+            tuple of str and dict: Post id and post content.
+
+        """
+        seen = set()
+        for file in cls._find_json_files(path):
+            for id, content in cls._extract_posts_from_json(file):
+                if unique:
+                    if id in seen:
+                        continue
+                    seen.add(id)
+                yield id, content
+
+    @staticmethod
+    def _find_json_files(path):
+        """
+        Helper method to list JSON files in their natural order.
+
+        Args:
+            path (str): A path to directory with JSON files.
+
+        Returns:
+            list: Paths to JSON files, including gzip compressed ones
+                and JSON Lines segments.
+
+        """
+        def natural_key(file):
+            return [int(part) if part.isdigit() else part
+                    for part in re.split('(\\d+)', str(file))]
+
+        files = [file for pattern in ['**/*.json', '**/*.json.gz', '**/*.jsonl.gz']
+                 for file in Path(path).glob(pattern)]
+        return sorted(files, key=natural_key)
+
+    @classmethod
+    def _extract_posts_from_json(cls, file_name):
+        """
+        Helper method to parse posts from a JSON file.
+
+        Args:
+            file_name (str): A JSON file or a JSON Lines segment to parse.
+
+        Returns:
+            list of tuples: Post ids and post contents.
+
+        """
+        if str(file_name).endswith('.jsonl.gz'):
+            return [cls._extract_post(node)
+                    for content in cls._iter_json_lines(file_name)
+                    for node in cls._extract_edges(content)]
+        return [cls._extract_post(node) for node in cls._extract_edges_from_json(file_name)]
+
+    @staticmethod
+    def _iter_json_lines(file_name):
+        """
+        Helper method to read API responses from a JSON Lines segment.
+
+        A page truncated by an interrupted write ends the segment.
+
+        Args:
+            file_name (str): A gzip compressed JSON Lines file.
+
+        Yields:
+            dict: API response.
+
+        """
+        with gzip.open(file_name, 'rt', encoding='utf8') as file:
+            try:
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+            except (EOFError, gzip.BadGzipFile):
+                return
+
     @classmethod
     def _extract_edges_from_json(cls, file_name):
         """
         Helper method to parse edges from a JSON file.
 
         Args:
-            file_name (str): A JSON file to parse.
+            file_name (str): A JSON file to parse, gzip compressed
+                if its name ends with '.gz'.
 
         Returns:
             list: Edges parsed from a JSON file.
 
         """
-        with open(file_name, 'r') as file:
+        opener = gzip.open if str(file_name).endswith('.gz') else open
+        with opener(file_name, 'rt') as file:
             content = json.load(file)
 
+        return cls._extract_edges(content)
+
+    @classmethod
+    def _extract_edges(cls, content):
+        """
+        Helper method to parse edges from an API response.
+
+        Args:
+            content (dict): API response.
+
+        Returns:
+            list: Edges parsed from the API response.
+
+        """
         all_edges = []
 
         for edges in content[cls.JSON_FIELD]['recent']['sections']:
@@ -163,13 +775,17 @@ class Posts:
 
         Args:
             hashtags (list): Existing hashtags.
-            to_detect (list): Unwanted hashtags to search for.
+            to_detect (set): Unwanted hashtags to search for. Pass a set
+                when checking many posts, other collections are converted
+                on every call.
 
         Returns:
             bool: True if any unwanted hashtag found, False otherwise.
 
         """
-        return any([tag in hashtags for tag in to_detect if hashtags])
+        if not isinstance(to_detect, (set, frozenset)):
+            to_detect = set(to_detect)
+        return bool(hashtags) and not to_detect.isdisjoint(hashtags)
 
     @staticmethod
     def _load_junk_hashtags(file_path):
@@ -205,9 +821,56 @@ class Posts:
         """
         if file_path:
             junk_hashtags = self._load_junk_hashtags(file_path)
-        posts = {id: post for id, post in self.posts.items(
-        ) if not self._detect_junk_hashtags(post['hashtags'], junk_hashtags)}
-        return Posts(posts)
+        junk_ids = self.index.any(junk_hashtags)
+        posts = {id: post for id, post in self.posts.items() if id not in junk_ids}
+        filtered = Posts(posts)
+        if len(junk_ids) < len(posts):
+            filtered._index = self.index.copy()
+            for id in junk_ids:
+                filtered._index.remove(id, self.posts[id]['hashtags'])
+        return filtered
+
+    def select_posts(self, any_hashtags=None, all_hashtags=None):
+        """Select posts with any or all of the given hashtags.
+
+        Args:
+            any_hashtags (list): Posts must have at least one of these
+                hashtags. Defaults to None.
+            all_hashtags (list): Posts must have all of these hashtags.
+                Defaults to None.
+
+        Returns:
+            A new Posts object of the same class with matching posts.
+
+        """
+        ids = None
+        if any_hashtags is not None:
+            ids = self.index.any(any_hashtags)
+        if all_hashtags is not None:
+            matches = self.index.all(all_hashtags)
+            ids = matches if ids is None else ids & matches
+        if ids is None:
+            return type(self)(dict(self.posts))
+        return type(self)({id: post for id, post in self.posts.items() if id in ids})
+
+    def where(self, **conditions):
+        """Lazily select posts meeting all conditions.
+
+        Queries can be chained, e.g.
+        posts.where(hashtags_any=['art']).where(min_likes=100), and are
+        evaluated only when their results are needed.
+
+        Args:
+            **conditions: Conditions supported by PostsQuery.where, i.e.
+                hashtags_any, hashtags_all, user_id, user_name, since,
+                until, min_likes, max_likes, min_comments, max_comments
+                and predicate.
+
+        Returns:
+            PostsQuery: A lazy view of the matching posts.
+
+        """
+        return PostsQuery(self).where(**conditions)
 
     def set_custom_categories(self, file_path, name='categories'):
         """Assign posts to categories based on existing hashtags.
@@ -224,13 +887,61 @@ class Posts:
 
         """
         categories_mapping = self._load_custom_categories(file_path)
-        for post in self.posts:
-            hashtags = self.posts[post].get('hashtags')
-            self.posts[post][name] = self._hashtags_to_categories(
-                categories_mapping, hashtags) if hashtags else None
+        assigned = dict()
+        for category, hashtags in categories_mapping.items():
+            for id in self.index.any(hashtags):
+                assigned.setdefault(id, []).append(category)
+
+        for id, post in self.posts.items():
+            post[name] = assigned.get(id)
 
         if self.df is not None:
-            self.to_df()
+            import pandas as pd
+            ids = self.df.index.astype(str) if self._is_compact(self.df) else self.df.index
+            self.df[name] = pd.Series([assigned.get(id) for id in ids],
+                                      index=self.df.index, dtype=object)
+
+    @classmethod
+    def stream_custom_categories(cls, posts, file_path, name='categories'):
+        """Lazily assign posts to categories based on existing hashtags.
+
+        Streaming version of set_custom_categories.
+
+        Args:
+            posts (iterable): Post ids and contents, e.g. from iter_json_files.
+            file_path (str): A path to a CSV file including custom categories.
+            name (str): A new variable name. Defaults to 'categories'.
+
+        Yields:
+            tuple of str and dict: Post id and post content.
+
+        """
+        categories, lookup = cls._compile_categories(cls._load_custom_categories(file_path))
+        for id, post in posts:
+            matches = {i for tag in post.get('hashtags') or () for i in lookup.get(tag, ())}
+            post[name] = [categories[i] for i in sorted(matches)] or None
+            yield id, post
+
+    @staticmethod
+    def _compile_categories(custom_categories):
+        """Helper method to map hashtags to the categories including them.
+
+        Args:
+            custom_categories (dict): Mapping of categories to hashtags.
+
+        Returns:
+            tuple of list and dict: Category names and mapping of hashtags
+                to positions of categories in that list.
+
+        """
+        categories = list(custom_categories)
+        lookup = dict()
+        for i, category in enumerate(categories):
+            for tag in custom_categories[category]:
+                positions = lookup.setdefault(tag, [])
+                if i not in positions:
+                    positions.append(i)
+        return categories, lookup
 
     @classmethod
     def _load_custom_categories(cls, file_path):
@@ -261,57 +972,320 @@ class Posts:
             list or None: Assigned categories if relevant.
 
         """
-        categories = []
-        if custom_categories and hashtags:
-            for name, categories_lst in custom_categories.items():
-                for tag in hashtags:
-                    if tag in categories_lst:
-                        categories.append(name)
-                        break
-        return categories if categories else None
+        if not custom_categories or not hashtags:
+            return None
+        names, lookup = cls._compile_categories(custom_categories)
+        matches = {i for tag in hashtags for i in lookup.get(tag, ())}
+        return [names[i] for i in sorted(matches)] or None
 
-    def popular_categories(self, category='categories', pct=True):
+    def popular_categories(self, category='categories', pct=True, capacity=None):
         """Check the popularity of categories.
 
         Args:
             category (str): Variable name. Defaults to 'categories'.
             pct (bool): Percent for categories if True, otherwise the number
                 of posts within categories.
+            capacity (int): Count approximately with a SpaceSaving sketch
+                of this many values if given. Defaults to None.
 
         Returns:
             list of tuples: Results for each category.
 
         """
+        if capacity is not None:
+            return self.stream_popular_categories(self.posts.items(), category, pct, capacity)
         categories = [
             v['categories'] for k, v in self.posts.items() if v['categories']]
         categories_list = [item for sublist in categories for item in sublist]
         most_common = Counter(categories_list).most_common()
-        if pct:
-            return [(value, round((count / len(self.posts)) * 100, 2))
-                    for value, count in most_common]
-        return most_common
+        return self._to_pct(most_common, len(self.posts)) if pct else most_common
 
-    def popular_hashtags(self, n=10, pct=False):
+    def popular_hashtags(self, n=10, pct=False, capacity=None):
         """Find the most popular hashtags.
 
         Args:
             n (int): Number of hashtags to show.
             pct (bool): Percent of all posts if True, otherwise the number
                     of posts with relevant hashtags.
+            capacity (int): Count approximately with a SpaceSaving sketch
+                of this many values if given. Defaults to None.
+
+        Returns:
+            list of tuples: Results for each category.
+
+        """
+        if capacity is not None:
+            return self.stream_popular_hashtags(self.posts.items(), n, pct, capacity)
+        most_common = self.index.counts.most_common(n)
+        return self._to_pct(most_common, len(self.posts)) if pct else most_common
+
+    def popular_categories_over_time(self, period='month', category='categories',
+                                     pct=True, step=None, since=None, until=None):
+        """Check the popularity of categories in consecutive periods of time.
+
+        Args:
+            period (str or timedelta): 'day', 'week', 'month' or the length
+                of a rolling window. Defaults to 'month'.
+            category (str): Variable name. Defaults to 'categories'.
+            pct (bool): Percent of posts from a period if True, otherwise
+                the number of posts within categories.
+            step (timedelta): Distance between rolling windows. Defaults
+                to the length of the window.
+            since (datetime or str): Earliest timestamp, inclusive.
+            until (datetime or str): Latest timestamp, exclusive.
+
+        Returns:
+            list of tuples: Start of each period and results for
+                each category.
+
+        """
+        return [(start, self._to_pct(counter.most_common(), total) if pct
+                 else counter.most_common())
+                for start, counter, total in self._count_over_time(
+                    category, period, step, since, until)]
+
+    def popular_hashtags_over_time(self, period='month', n=10, pct=False,
+                                   step=None, since=None, until=None):
+        """Find the most popular hashtags in consecutive periods of time.
+
+        Periods are counted in a single pass over posts sorted by time;
+        rolling windows are updated with the posts entering and leaving
+        them instead of being counted from scratch.
+
+        Args:
+            period (str or timedelta): 'day', 'week', 'month' or the length
+                of a rolling window. Defaults to 'month'.
+            n (int): Number of hashtags to show.
+            pct (bool): Percent of posts from a period if True, otherwise
+                the number of posts with relevant hashtags.
+            step (timedelta): Distance between rolling windows. Defaults
+                to the length of the window.
+            since (datetime or str): Earliest timestamp, inclusive.
+            until (datetime or str): Latest timestamp, exclusive.
+
+        Returns:
+            list of tuples: Start of each period and results for
+                each hashtag.
+
+        """
+        return [(start, self._to_pct(counter.most_common(n), total) if pct
+                 else counter.most_common(n))
+                for start, counter, total in self._count_over_time(
+                    'hashtags', period, step, since, until)]
+
+    def _count_over_time(self, name, period, step, since, until):
+        """Helper method to count values of a list variable over time.
+
+        Args:
+            name (str): Variable name.
+            period (str or timedelta): Calendar period or rolling window.
+            step (timedelta): Distance between rolling windows.
+            since (datetime or str): Earliest timestamp, inclusive.
+            until (datetime or str): Latest timestamp, exclusive.
+
+        Yields:
+            tuple of datetime, Counter and int: Start of a period, counted
+                values and number of posts. The counter of rolling windows
+                is updated in place for the following windows.
+
+        """
+        if isinstance(period, str):
+            for start, ids in self.time_index.periods(period, since, until):
+                counter, total = self._count_values(
+                    ((id, self.posts[id]) for id in ids), name)
+                yield start, counter, total
+            return
+
+        counter = Counter()
+        total = 0
+        for start, entered, left in self.time_index.rolling(period, step, since, until):
+            for id in entered:
+                counter.update(self.posts[id].get(name) or ())
+            for id in left:
+                values = self.posts[id].get(name) or ()
+                counter.subtract(values)
+                for value in values:
+                    if counter[value] <= 0:
+                        counter.pop(value, None)
+            total += len(entered) - len(left)
+            yield start, counter, total
+
+    @staticmethod
+    def _to_pct(most_common, total):
+        """Helper method to convert counts to percent of all posts.
+
+        Args:
+            most_common (list of tuples): Values and their counts.
+            total (int): Number of all posts.
+
+        Returns:
+            list of tuples: Values and their percentages.
+
+        """
+        return [(value, round((count / total) * 100, 2) if total else 0.0)
+                for value, count in most_common]
+
+    @classmethod
+    def stream_remove_posts(cls, posts, junk_hashtags=None, file_path=None):
+        """Lazily remove posts with unwanted hashtags.
+
+        Streaming version of remove_posts.
+
+        Args:
+            posts (iterable): Post ids and contents, e.g. from iter_json_files.
+            junk_hashtags (list): Unwanted hashtags.
+            file_path (str): A path to a file containing unwanted hashtags.
+                Defaults to None.
+
+        Yields:
+            tuple of str and dict: Post id and post content.
+
+        """
+        if file_path:
+            junk_hashtags = cls._load_junk_hashtags(file_path)
+        junk_hashtags = set(junk_hashtags)
+        for id, post in posts:
+            if not cls._detect_junk_hashtags(post['hashtags'], junk_hashtags):
+                yield id, post
+
+    @classmethod
+    def stream_popular_categories(cls, posts, category='categories', pct=True, capacity=None):
+        """Check the popularity of categories in a stream of posts.
+
+        Streaming version of popular_categories.
+
+        Args:
+            posts (iterable): Post ids and contents, e.g. from iter_json_files.
+            category (str): Variable name. Defaults to 'categories'.
+            pct (bool): Percent for categories if True, otherwise the number
+                of posts within categories.
+            capacity (int): Count approximately with a SpaceSaving sketch
+                of this many values if given. Defaults to None.
 
         Returns:
             list of tuples: Results for each category.
 
         """
-        if not self.hashes:
-            self.to_hashes()
-        hash_list = [item for sublist in self.hashes for item in sublist]
+        if capacity is not None:
+            sketch = cls.sketch(posts, category, capacity)
+            most_common = sketch.most_common()
+            return cls._to_pct(most_common, sketch.records) if pct else most_common
+        counter, total = cls._count_values(posts, category)
+        most_common = counter.most_common()
+        return cls._to_pct(most_common, total) if pct else most_common
+
+    @classmethod
+    def stream_popular_hashtags(cls, posts, n=10, pct=False, capacity=None):
+        """Find the most popular hashtags in a stream of posts.
 
-        most_common = Counter(hash_list).most_common(n)
-        if pct:
-            return [(value, round((count / len(self.posts)) * 100, 2))
-                    for value, count in most_common]
-        return most_common
+        Streaming version of popular_hashtags.
+
+        Args:
+            posts (iterable): Post ids and contents, e.g. from iter_json_files.
+            n (int): Number of hashtags to show.
+            pct (bool): Percent of all posts if True, otherwise the number
+                    of posts with relevant hashtags.
+            capacity (int): Count approximately with a SpaceSaving sketch
+                of this many values if given, so memory does not grow
+                with the number of distinct hashtags. Defaults to None.
+
+        Returns:
+            list of tuples: Results for each hashtag.
+
+        """
+        if capacity is not None:
+            sketch = cls.sketch(posts, 'hashtags', capacity)
+            most_common = sketch.most_common(n)
+            return cls._to_pct(most_common, sketch.records) if pct else most_common
+        counter, total = cls._count_values(posts, 'hashtags')
+        most_common = counter.most_common(n)
+        return cls._to_pct(most_common, total) if pct else most_common
+
+    @staticmethod
+    def sketch(posts, name='hashtags', capacity=DEFAULT_CAPACITY):
+        """Approximately count values of a list variable in bounded memory.
+
+        Args:
+            posts (iterable): Post ids and contents.
+            name (str): Variable name. Defaults to 'hashtags'.
+            capacity (int): Number of counted values. Defaults to 1000.
+
+        Returns:
+            SpaceSaving: A sketch which can be merged with others
+                and saved as JSON.
+
+        """
+        sketch = SpaceSaving(capacity)
+        for _, post in posts:
+            sketch.update(post.get(name))
+        return sketch
+
+    @classmethod
+    def sketch_json_files(cls, path, name='hashtags', capacity=DEFAULT_CAPACITY,
+                          workers=None):
+        """Approximately count values of a list variable in JSON files.
+
+        A sketch is made for each file, optionally in parallel, and the
+        sketches are merged. Unlike iter_json_files, posts repeated
+        in several files are counted more than once.
+
+        Args:
+            path (str): A path to directory with JSON files obtained from API.
+            name (str): Variable name. Defaults to 'hashtags'.
+            capacity (int): Number of counted values. Defaults to 1000.
+            workers (int): Number of processes. Files are processed in the
+                current process if None. Defaults to None.
+
+        Returns:
+            SpaceSaving: A sketch of all files.
+
+        """
+        files = cls._find_json_files(path)
+        names, capacities = [name] * len(files), [capacity] * len(files)
+        if not workers or not files:
+            sketches = map(cls._sketch_json_file, files, names, capacities)
+            return SpaceSaving.merge_all(sketches, capacity)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(files) // (workers * 4))
+            sketches = executor.map(cls._sketch_json_file, files, names, capacities,
+                                    chunksize=chunksize)
+            return SpaceSaving.merge_all(sketches, capacity)
+
+    @classmethod
+    def _sketch_json_file(cls, file_name, name, capacity):
+        """Helper method to make a sketch of a single JSON file.
+
+        Args:
+            file_name (str): A JSON file or a JSON Lines segment.
+            name (str): Variable name.
+            capacity (int): Number of counted values.
+
+        Returns:
+            SpaceSaving: A sketch of the file.
+
+        """
+        return cls.sketch(cls._extract_posts_from_json(file_name), name, capacity)
+
+    @staticmethod
+    def _count_values(posts, name):
+        """Helper method to count values of a list variable in a stream of posts.
+
+        Args:
+            posts (iterable): Post ids and contents.
+            name (str): Variable name.
+
+        Returns:
+            tuple of Counter and int: Counted values and number of posts.
+
+        """
+        counter = Counter()
+        total = 0
+        for _, post in posts:
+            total += 1
+            values = post.get(name)
+            if values:
+                counter.update(values)
+        return counter, total
 
 
 class HashtagPosts(Posts):
@@ -0,0 +1,203 @@
+from .timeindex import TimeIndex
+
+
+class PostsQuery:
+    """
+    Lazy, composable selection of posts.
+
+    Conditions added with consecutive where calls are merged and evaluated
+    together when the results are first needed. Hashtag conditions are
+    served by the inverted index of the collection and time ranges by its
+    time index, the remaining ones are checked in a single pass over
+    the candidate posts. Results refer to the records of the collection
+    instead of copying them.
+
+    Args:
+        collection (Posts): Collection of posts to select from.
+
+    Methods:
+        where: Add conditions to the query.
+        ids: Ids of the selected posts.
+        collect: Create a Posts object with the selected posts.
+        popular_hashtags: Find the most popular hashtags.
+        popular_categories: Check the popularity of categories.
+
+    """
+
+    def __init__(self, collection, conditions=None):
+        self.collection = collection
+        self.conditions = conditions or dict()
+        self._ids = None
+
+    def __repr__(self):
+        return f'Query of {len(self.collection.posts)} Instagram posts: {self.conditions}'
+
+    def __len__(self):
+        return len(self.ids())
+
+    def __iter__(self):
+        posts = self.collection.posts
+        for id in self.ids():
+            yield id, posts[id]
+
+    def where(self, hashtags_any=None, hashtags_all=None, user_id=None, user_name=None,
+              since=None, until=None, min_likes=None, max_likes=None,
+              min_comments=None, max_comments=None, predicate=None):
+        """Add conditions to the query.
+
+        All conditions must be met. Repeated conditions are narrowed,
+        e.g. two since dates result in the later one.
+
+        Args:
+            hashtags_any (list): Posts must have at least one of these hashtags.
+            hashtags_all (list): Posts must have all of these hashtags.
+            user_id (int or list): Id or ids of the authors.
+            user_name (str or list): Name or names of the authors.
+            since (datetime or str): Earliest timestamp, inclusive.
+            until (datetime or str): Latest timestamp, exclusive.
+            min_likes (int): Minimum number of likes.
+            max_likes (int): Maximum number of likes.
+            min_comments (int): Minimum number of comments.
+            max_comments (int): Maximum number of comments.
+            predicate (callable): Function of a post content returning
+                True for the posts to select.
+
+        Returns:
+            PostsQuery: A new query with all conditions.
+
+        """
+        conditions = {name: list(value) if isinstance(value, list) else value
+                      for name, value in self.conditions.items()}
+
+        def narrow(name, value, combine):
+            if value is not None:
+                conditions[name] = combine(conditions[name], value) if name in conditions else value
+
+        if hashtags_any is not None:
+            conditions.setdefault('hashtags_any', []).append(set(hashtags_any))
+        narrow('hashtags_all', set(hashtags_all) if hashtags_all else None, set.union)
+        narrow('user_id', self._as_set(user_id), set.intersection)
+        narrow('user_name', self._as_set(user_name), set.intersection)
+        narrow('since', None if since is None else TimeIndex.to_epoch(since), max)
+        narrow('until', None if until is None else TimeIndex.to_epoch(until), min)
+        narrow('min_likes', min_likes, max)
+        narrow('max_likes', max_likes, min)
+        narrow('min_comments', min_comments, max)
+        narrow('max_comments', max_comments, min)
+        if predicate is not None:
+            conditions.setdefault('predicate', []).append(predicate)
+        return PostsQuery(self.collection, conditions)
+
+    def ids(self):
+        """Ids of the selected posts.
+
+        Posts are in the order of their timestamps if a time range is
+        given, otherwise in the order of the collection, unless hashtag
+        conditions are used.
+
+        Returns:
+            list: Post ids.
+
+        """
+        if self._ids is None:
+            self._ids = self._execute()
+        return self._ids
+
+    def collect(self):
+        """Create a Posts object with the selected posts.
+
+        Returns:
+            A new object of the class of the collection, sharing
+            post contents with it.
+
+        """
+        posts = self.collection.posts
+        return type(self.collection)({id: posts[id] for id in self.ids()})
+
+    def popular_hashtags(self, n=10, pct=False):
+        """Find the most popular hashtags among the selected posts.
+
+        Args:
+            n (int): Number of hashtags to show.
+            pct (bool): Percent of the selected posts if True, otherwise
+                    the number of posts with relevant hashtags.
+
+        Returns:
+            list of tuples: Results for each hashtag.
+
+        """
+        return self.collection.stream_popular_hashtags(iter(self), n, pct)
+
+    def popular_categories(self, category='categories', pct=True):
+        """Check the popularity of categories among the selected posts.
+
+        Args:
+            category (str): Variable name. Defaults to 'categories'.
+            pct (bool): Percent for categories if True, otherwise the number
+                of posts within categories.
+
+        Returns:
+            list of tuples: Results for each category.
+
+        """
+        return self.collection.stream_popular_categories(iter(self), category, pct)
+
+    def _execute(self):
+        """Helper method to evaluate all conditions in a single pass.
+
+        Returns:
+            list: Ids of the selected posts.
+
+        """
+        conditions = self.conditions
+        posts = self.collection.posts
+        index = self.collection.index
+        candidates = None
+        for hashtags in conditions.get('hashtags_any', ()):
+            matches = index.any(hashtags)
+            candidates = matches if candidates is None else candidates & matches
+        if 'hashtags_all' in conditions:
+            matches = index.all(conditions['hashtags_all'])
+            candidates = matches if candidates is None else candidates & matches
+        ids = posts if candidates is None else candidates
+        if 'since' in conditions or 'until' in conditions:
+            in_range = self.collection.time_index.range(
+                conditions.get('since'), conditions.get('until'))
+            ids = in_range if candidates is None else [
+                id for id in in_range if id in candidates]
+
+        checks = self._checks()
+        if not checks:
+            return list(ids)
+        return [id for id in ids if all(check(posts[id]) for check in checks)]
+
+    def _checks(self):
+        """Helper method to convert conditions on post contents to functions.
+
+        Returns:
+            list: Functions of a post content.
+
+        """
+        conditions = self.conditions
+        checks = []
+        if 'user_id' in conditions:
+            checks.append(lambda post: post['user_id'] in conditions['user_id'])
+        if 'user_name' in conditions:
+            checks.append(lambda post: post['user_name'] in conditions['user_name'])
+        if 'min_likes' in conditions:
+            checks.append(lambda post: post['likes'] >= conditions['min_likes'])
+        if 'max_likes' in conditions:
+            checks.append(lambda post: post['likes'] <= conditions['max_likes'])
+        if 'min_comments' in conditions:
+            checks.append(lambda post: post['comments'] >= conditions['min_comments'])
+        if 'max_comments' in conditions:
+            checks.append(lambda post: post['comments'] <= conditions['max_comments'])
+        checks.extend(conditions.get('predicate', ()))
+        return checks
+
+    @staticmethod
+    def _as_set(value):
+        """Helper method to convert a value or a list of values to a set."""
+        if value is None:
+            return None
+        return set(value) if isinstance(value, (list, tuple, set)) else {value}
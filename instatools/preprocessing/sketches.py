@@ -0,0 +1,239 @@
+import heapq
+import json
+
+DEFAULT_CAPACITY = 1000
+
+
+class SpaceSaving:
+    """
+    Approximate counts of the most frequent values in bounded memory.
+
+    Implements the Space-Saving algorithm: at most capacity values are
+    counted and a new value replaces the least frequent one, inheriting
+    its count as a possible overestimate. Counts are never underestimated
+    and overestimated by at most total / capacity, so every value more
+    frequent than that is kept. Sketches of separate batches of posts
+    can be merged and saved as JSON.
+
+    Args:
+        capacity (int): Number of counted values. Defaults to 1000.
+
+    Attributes:
+        counts (dict): Estimated counts of the kept values.
+        errors (dict): Maximum overestimate of each count.
+        total (int): Number of counted values, including repetitions.
+        records (int): Number of counted posts.
+
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        self.counts = dict()
+        self.errors = dict()
+        self.total = 0
+        self.records = 0
+        self._heap = []
+
+    def __repr__(self):
+        return f'Sketch of {len(self.counts)} out of {self.capacity} values'
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, value, count=1):
+        """Count a value.
+
+        Args:
+            value (str): Counted value, e.g. a hashtag.
+            count (int): Number of occurrences. Defaults to 1.
+
+        """
+        self.total += count
+        if value in self.counts:
+            self.counts[value] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = count
+            self.errors[value] = 0
+        else:
+            minimum, evicted = self._pop_minimum()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[value] = minimum + count
+            self.errors[value] = minimum
+        self._push(value)
+
+    def update(self, values):
+        """Count the values of a single post, e.g. its hashtags.
+
+        Args:
+            values (list): Values of the post, None if missing.
+
+        Returns:
+            SpaceSaving: The sketch itself.
+
+        """
+        self.records += 1
+        for value in values or ():
+            self.add(value)
+        return self
+
+    def most_common(self, n=None):
+        """List the most frequent values.
+
+        Args:
+            n (int): Number of values, all kept values if None.
+
+        Returns:
+            list of tuples: Values and their estimated counts.
+
+        """
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])
+        return ranked if n is None else ranked[:n]
+
+    def bounds(self, n=None):
+        """List the most frequent values with bounds of their counts.
+
+        Args:
+            n (int): Number of values, all kept values if None.
+
+        Returns:
+            list of tuples: Values, lowest and highest possible counts.
+
+        """
+        return [(value, count - self.errors[value], count)
+                for value, count in self.most_common(n)]
+
+    def guaranteed(self, n):
+        """Check if the top values are certainly the most frequent ones.
+
+        Args:
+            n (int): Number of values.
+
+        Returns:
+            bool: True if the lowest possible count of each of the first
+                n values is not below the highest possible count of any
+                other value, so they are the true top n in some order.
+
+        """
+        bounds = self.bounds()
+        if n > len(bounds):
+            return len(self.counts) < self.capacity
+        if n == len(bounds):
+            highest_other = self._minimum() if len(self.counts) == self.capacity else 0
+        else:
+            highest_other = bounds[n][2]
+        return all(lowest >= highest_other for _, lowest, _ in bounds[:n])
+
+    def merge(self, other):
+        """Combine with a sketch of another batch of posts.
+
+        Values missing from a full sketch are counted as its smallest
+        count, which keeps counts and errors as upper bounds.
+
+        Args:
+            other (SpaceSaving): Another sketch.
+
+        Returns:
+            SpaceSaving: A new sketch with the capacity of the larger one.
+
+        """
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        missing = self._minimum() if len(self.counts) == self.capacity else 0
+        missing_other = other._minimum() if len(other.counts) == other.capacity else 0
+        combined = []
+        for value in set(self.counts) | set(other.counts):
+            count = self.counts.get(value, missing) + other.counts.get(value, missing_other)
+            error = self.errors.get(value, missing) + other.errors.get(value, missing_other)
+            combined.append((count, error, value))
+        for count, error, value in heapq.nlargest(merged.capacity, combined,
+                                                  key=lambda item: item[0]):
+            merged.counts[value] = count
+            merged.errors[value] = error
+            merged._push(value)
+        merged.total = self.total + other.total
+        merged.records = self.records + other.records
+        return merged
+
+    @classmethod
+    def merge_all(cls, sketches, capacity=DEFAULT_CAPACITY):
+        """Combine many sketches, e.g. one for each batch file.
+
+        Args:
+            sketches (iterable): Sketches to combine.
+            capacity (int): Capacity if there are no sketches.
+                Defaults to 1000.
+
+        Returns:
+            SpaceSaving: A new sketch.
+
+        """
+        merged = None
+        for sketch in sketches:
+            merged = sketch if merged is None else merged.merge(sketch)
+        return merged if merged is not None else cls(capacity)
+
+    def to_dict(self):
+        """Convert the sketch to a dict of JSON serializable values."""
+        return {
+            'capacity': self.capacity,
+            'total': self.total,
+            'records': self.records,
+            'counts': [[value, count, self.errors[value]]
+                       for value, count in self.most_common()],
+        }
+
+    @classmethod
+    def from_dict(cls, content):
+        """Create a sketch from the result of to_dict."""
+        sketch = cls(content['capacity'])
+        sketch.total = content['total']
+        sketch.records = content['records']
+        for value, count, error in content['counts']:
+            sketch.counts[value] = count
+            sketch.errors[value] = error
+            sketch._push(value)
+        return sketch
+
+    def to_json(self):
+        """Serialize the sketch to JSON."""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        """Create a sketch from the result of to_json."""
+        return cls.from_dict(json.loads(text))
+
+    def _push(self, value):
+        """Helper method to track the current count of a value in the heap.
+
+        Entries with outdated counts are left in the heap and skipped,
+        the heap is rebuilt once they outnumber the kept values.
+
+        """
+        heapq.heappush(self._heap, (self.counts[value], value))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, value) for value, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_minimum(self):
+        """Helper method to remove the entry of the least frequent value.
+
+        Returns:
+            tuple of int and str: Count and value.
+
+        """
+        while True:
+            count, value = heapq.heappop(self._heap)
+            if self.counts.get(value) == count:
+                return count, value
+
+    def _minimum(self):
+        """Helper method to find the smallest kept count."""
+        while self._heap:
+            count, value = self._heap[0]
+            if self.counts.get(value) == count:
+                return count
+            heapq.heappop(self._heap)
+        return 0
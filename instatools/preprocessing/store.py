@@ -0,0 +1,260 @@
+from pathlib import Path
+import sqlite3
+
+COLUMNS = ['url', 'user_id', 'user_name', 'user_full_name', 'timestamp',
+           'likes', 'comments', 'display_url', 'text']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    url TEXT,
+    user_id INTEGER,
+    user_name TEXT,
+    user_full_name TEXT,
+    timestamp TEXT,
+    likes INTEGER,
+    comments INTEGER,
+    display_url TEXT,
+    text TEXT,
+    hashtags_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS hashtags (
+    post_id TEXT NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (post_id, position)
+);
+CREATE TABLE IF NOT EXISTS categories (
+    post_id TEXT NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (post_id, name, position)
+);
+CREATE INDEX IF NOT EXISTS posts_user_id ON posts(user_id);
+CREATE INDEX IF NOT EXISTS posts_timestamp ON posts(timestamp);
+CREATE INDEX IF NOT EXISTS hashtags_tag ON hashtags(tag);
+CREATE INDEX IF NOT EXISTS categories_name ON categories(name, category);
+"""
+
+
+class PostsStore:
+    """
+    Persistent collection of Instagram posts stored in SQLite.
+
+    Posts, their hashtags and categories are kept in separate indexed
+    tables, so collections larger than memory can be filtered and
+    analysed without loading them.
+
+    Args:
+        path (str): A path to the SQLite database file.
+
+    Methods:
+        upsert: Insert new posts and update existing ones.
+        iter_posts: Lazily read posts from the store.
+        remove_posts: Delete posts with unwanted hashtags.
+        set_custom_categories: Assign posts to categories based on
+            existing hashtags.
+        popular_categories: Check the popularity of categories.
+        popular_hashtags: Find the most popular hashtags.
+
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.execute('PRAGMA foreign_keys=ON')
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def __repr__(self):
+        return f'{len(self)} Instagram posts in {self.path}'
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+    def upsert(self, posts, replace=True):
+        """Insert new posts and update existing ones.
+
+        It can be used as a sink of the scrapers.
+
+        Args:
+            posts (iterable): Post ids and contents.
+            replace (bool): Replace the content of existing posts if True,
+                otherwise keep their first version. Defaults to True.
+
+        Returns:
+            PostsStore: The store itself.
+
+        """
+        columns = ', '.join(COLUMNS)
+        placeholders = ', '.join('?' * (len(COLUMNS) + 2))
+        updates = ', '.join(f'{column} = excluded.{column}'
+                            for column in COLUMNS + ['hashtags_count'])
+        conflict = f'DO UPDATE SET {updates}' if replace else 'DO NOTHING'
+
+        with self._connection:
+            for id, post in posts:
+                hashtags = post.get('hashtags')
+                cursor = self._connection.execute(
+                    f'INSERT INTO posts (id, {columns}, hashtags_count) '
+                    f'VALUES ({placeholders}) ON CONFLICT(id) {conflict}',
+                    [id] + [post.get(column) for column in COLUMNS]
+                    + [None if hashtags is None else len(hashtags)])
+                if not cursor.rowcount:
+                    continue
+                self._connection.execute('DELETE FROM hashtags WHERE post_id = ?', (id,))
+                self._connection.execute('DELETE FROM categories WHERE post_id = ?', (id,))
+                self._connection.executemany(
+                    'INSERT INTO hashtags (post_id, position, tag) VALUES (?, ?, ?)',
+                    [(id, position, tag) for position, tag in enumerate(hashtags or ())])
+                self._connection.executemany(
+                    'INSERT INTO categories (post_id, name, position, category) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(id, name, position, category)
+                     for name, values in post.items()
+                     if name not in COLUMNS and name != 'hashtags' and isinstance(values, list)
+                     for position, category in enumerate(values)])
+        return self
+
+    def iter_posts(self):
+        """Lazily read posts from the store, in the order of insertion.
+
+        Yields:
+            tuple of str and dict: Post id and post content.
+
+        """
+        names = [name for name, in self._connection.execute(
+            'SELECT DISTINCT name FROM categories ORDER BY name')]
+        rows = self._connection.execute(
+            f'SELECT id, {", ".join(COLUMNS)}, hashtags_count FROM posts ORDER BY rowid')
+        for row in rows:
+            id = row[0]
+            record = dict(zip(COLUMNS, row[1:-1]))
+            record['hashtags'] = None if row[-1] is None else [
+                tag for tag, in self._connection.execute(
+                    'SELECT tag FROM hashtags WHERE post_id = ? ORDER BY position', (id,))]
+            for name in names:
+                record[name] = [category for category, in self._connection.execute(
+                    'SELECT category FROM categories WHERE post_id = ? AND name = ? '
+                    'ORDER BY position', (id, name))] or None
+            yield id, record
+
+    def remove_posts(self, junk_hashtags=None, file_path=None):
+        """Delete posts based on the predefined list of unwanted hashtags.
+
+        Unlike Posts.remove_posts, posts are removed from the store itself.
+
+        Args:
+            junk_hashtags (list): Unwanted hashtags.
+            file_path (str): A path to a file containing unwanted hashtags.
+                Defaults to None.
+
+        Returns:
+            int: Number of removed posts.
+
+        """
+        from .preprocessing import Posts
+        if file_path:
+            junk_hashtags = Posts._load_junk_hashtags(file_path)
+        with self._connection:
+            self._select_tags(junk_hashtags)
+            cursor = self._connection.execute(
+                'DELETE FROM posts WHERE id IN (SELECT post_id FROM hashtags '
+                'WHERE tag IN (SELECT tag FROM selected_tags))')
+        return cursor.rowcount
+
+    def set_custom_categories(self, file_path, name='categories'):
+        """Assign posts to categories based on existing hashtags.
+
+        Category to hashtags mapping is provided via the CSV file.
+
+        Args:
+            file_path (str): A path to a CSV file including custom categories.
+            name (str): A new variable name. Defaults to 'categories'.
+
+        """
+        from .preprocessing import Posts
+        categories_mapping = Posts._load_custom_categories(file_path)
+        with self._connection:
+            self._connection.execute('DELETE FROM categories WHERE name = ?', (name,))
+            for position, (category, hashtags) in enumerate(categories_mapping.items()):
+                self._select_tags(hashtags)
+                self._connection.execute(
+                    'INSERT INTO categories (post_id, name, position, category) '
+                    'SELECT DISTINCT post_id, ?, ?, ? FROM hashtags '
+                    'WHERE tag IN (SELECT tag FROM selected_tags)',
+                    (name, position, category))
+
+    def _select_tags(self, hashtags):
+        """Helper method to put hashtags in a temporary table used by queries.
+
+        Args:
+            hashtags (list): Hashtags to select.
+
+        """
+        self._connection.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS selected_tags (tag TEXT PRIMARY KEY)')
+        self._connection.execute('DELETE FROM selected_tags')
+        self._connection.executemany(
+            'INSERT OR IGNORE INTO selected_tags (tag) VALUES (?)',
+            [(tag,) for tag in hashtags])
+
+    def popular_categories(self, category='categories', pct=True):
+        """Check the popularity of categories.
+
+        Args:
+            category (str): Variable name. Defaults to 'categories'.
+            pct (bool): Percent for categories if True, otherwise the number
+                of posts within categories.
+
+        Returns:
+            list of tuples: Results for each category.
+
+        """
+        most_common = self._connection.execute(
+            'SELECT category, COUNT(*) FROM categories WHERE name = ? '
+            'GROUP BY category ORDER BY COUNT(*) DESC, MIN(rowid)', (category,)).fetchall()
+        return self._to_pct(most_common) if pct else most_common
+
+    def popular_hashtags(self, n=10, pct=False):
+        """Find the most popular hashtags.
+
+        Args:
+            n (int): Number of hashtags to show.
+            pct (bool): Percent of all posts if True, otherwise the number
+                    of posts with relevant hashtags.
+
+        Returns:
+            list of tuples: Results for each hashtag.
+
+        """
+        most_common = self._connection.execute(
+            'SELECT tag, COUNT(*) FROM hashtags '
+            'GROUP BY tag ORDER BY COUNT(*) DESC, MIN(rowid) LIMIT ?',
+            (-1 if n is None else n,)).fetchall()
+        return self._to_pct(most_common) if pct else most_common
+
+    def _to_pct(self, most_common):
+        """Helper method to convert counts to percent of all posts.
+
+        Args:
+            most_common (list of tuples): Values and their counts.
+
+        Returns:
+            list of tuples: Values and their percentages.
+
+        """
+        total = len(self)
+        return [(value, round((count / total) * 100, 2) if total else 0.0)
+                for value, count in most_common]
@@ -0,0 +1,227 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+PERIODS = ('day', 'week', 'month')
+
+
+class TimeIndex:
+    """
+    Sorted index of post timestamps.
+
+    Timestamps are kept as seconds since the epoch, so posts from a range
+    of time are found with a binary search. Naive dates are treated
+    as UTC, like the timestamps of posts.
+
+    Args:
+        posts (dict): Collection of posts to index. Defaults to None.
+
+    Attributes:
+        times (list): Sorted timestamps of the posts.
+        ids (list): Post ids in the order of their timestamps.
+
+    """
+
+    def __init__(self, posts=None):
+        entries = sorted((self.to_epoch(post['timestamp']), id)
+                         for id, post in (posts or {}).items()
+                         if post.get('timestamp') is not None)
+        self.times = [time for time, _ in entries]
+        self.ids = [id for _, id in entries]
+
+    def __repr__(self):
+        return f'Index of {len(self.ids)} timestamps'
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, id, timestamp):
+        """Add a post to the index.
+
+        Args:
+            id (str): Post id.
+            timestamp (str): Timestamp of the post.
+
+        """
+        if timestamp is None:
+            return
+        time = self.to_epoch(timestamp)
+        position = bisect_right(self.times, time)
+        self.times.insert(position, time)
+        self.ids.insert(position, id)
+
+    def remove(self, id, timestamp):
+        """Remove a post from the index.
+
+        Args:
+            id (str): Post id.
+            timestamp (str): Timestamp of the post.
+
+        """
+        if timestamp is None:
+            return
+        time = self.to_epoch(timestamp)
+        position = bisect_left(self.times, time)
+        while position < len(self.times) and self.times[position] == time:
+            if self.ids[position] == id:
+                del self.times[position]
+                del self.ids[position]
+                return
+            position += 1
+
+    def range(self, since=None, until=None):
+        """Find posts from a range of time.
+
+        Args:
+            since (datetime or str): Earliest timestamp, inclusive.
+            until (datetime or str): Latest timestamp, exclusive.
+
+        Returns:
+            list: Post ids in the order of their timestamps.
+
+        """
+        start, stop = self._bounds(since, until)
+        return self.ids[start:stop]
+
+    def periods(self, period='month', since=None, until=None):
+        """Group posts by calendar periods.
+
+        Args:
+            period (str): 'day', 'week' (starting on Monday) or 'month'.
+            since (datetime or str): Earliest timestamp, inclusive.
+            until (datetime or str): Latest timestamp, exclusive.
+
+        Yields:
+            tuple of datetime and list: Start of a period and ids of
+                its posts. Periods without posts are skipped.
+
+        """
+        if period not in PERIODS:
+            raise ValueError(f'period must be one of {PERIODS}, not {period!r}')
+        start, stop = self._bounds(since, until)
+        while start < stop:
+            begin = self._period_start(self.times[start], period)
+            end = bisect_left(self.times, self.to_epoch(self._next_period(begin, period)),
+                              start, stop)
+            yield begin, self.ids[start:end]
+            start = end
+
+    def rolling(self, window, step=None, since=None, until=None):
+        """Slide a window of fixed length over posts.
+
+        Only posts entering and leaving the window are reported, so
+        statistics of consecutive windows can be updated incrementally.
+
+        Args:
+            window (timedelta): Length of the window.
+            step (timedelta): Distance between consecutive windows.
+                Defaults to the length of the window.
+            since (datetime or str): Start of the first window. Defaults
+                to the earliest timestamp.
+            until (datetime or str): Latest timestamp, exclusive.
+
+        Yields:
+            tuple of datetime, list and list: Start of a window, ids of
+                posts entering it and ids of posts leaving it.
+
+        """
+        step = step or window
+        if window.total_seconds() <= 0 or step.total_seconds() <= 0:
+            raise ValueError('window and step must be positive')
+        first, stop = self._bounds(since, until)
+        if first >= stop:
+            return
+        begin = self.to_epoch(since) if since is not None else self.times[first]
+        entered = left = first
+        while begin <= self.times[stop - 1]:
+            end = bisect_left(self.times, begin + window.total_seconds(), first, stop)
+            start = bisect_left(self.times, begin, first, stop)
+            yield (datetime.fromtimestamp(begin, timezone.utc).replace(tzinfo=None),
+                   self.ids[max(entered, start):end], self.ids[left:min(start, entered)])
+            entered, left = max(entered, end), max(left, start)
+            begin += step.total_seconds()
+
+    def copy(self):
+        """Create an independent copy of the index."""
+        index = TimeIndex()
+        index.times = list(self.times)
+        index.ids = list(self.ids)
+        return index
+
+    def _bounds(self, since, until):
+        """Helper method to find positions of a range of time.
+
+        Args:
+            since (datetime or str): Earliest timestamp, inclusive.
+            until (datetime or str): Latest timestamp, exclusive.
+
+        Returns:
+            tuple of int: Start and stop positions.
+
+        """
+        start = 0 if since is None else bisect_left(self.times, self.to_epoch(since))
+        stop = len(self.times) if until is None else bisect_left(self.times, self.to_epoch(until))
+        return start, max(start, stop)
+
+    @staticmethod
+    def to_epoch(value):
+        """Convert a date or an ISO timestamp to seconds since the epoch.
+
+        Args:
+            value (datetime, str or float): Date, treated as UTC if naive,
+                or seconds since the epoch.
+
+        Returns:
+            float: Seconds since the epoch.
+
+        """
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                from dateutil.parser import isoparse
+                value = isoparse(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    @staticmethod
+    def _period_start(time, period):
+        """Helper method to find the start of a calendar period.
+
+        Args:
+            time (float): Seconds since the epoch.
+            period (str): 'day', 'week' or 'month'.
+
+        Returns:
+            datetime: Naive UTC start of the period.
+
+        """
+        date = datetime.fromtimestamp(time, timezone.utc).replace(
+            tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+        if period == 'week':
+            return date - timedelta(days=date.weekday())
+        if period == 'month':
+            return date.replace(day=1)
+        return date
+
+    @staticmethod
+    def _next_period(start, period):
+        """Helper method to find the start of the following period.
+
+        Args:
+            start (datetime): Start of a period.
+            period (str): 'day', 'week' or 'month'.
+
+        Returns:
+            datetime: Start of the next period.
+
+        """
+        if period == 'day':
+            return start + timedelta(days=1)
+        if period == 'week':
+            return start + timedelta(weeks=1)
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
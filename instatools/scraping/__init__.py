@@ -1,5 +1,27 @@
-from .scraping import (
-    HashtagScraper,
-    LocationScraper,
-    Scraper,
-)
+import importlib
+
+# Classes are imported from their modules on first use.
+ATTRIBUTES = {
+    'AsyncScraper': 'scraping',
+    'HashtagScraper': 'scraping',
+    'LocationScraper': 'scraping',
+    'Scraper': 'scraping',
+    'configure_logging': 'scraping',
+    'DownloadManifest': 'manifest',
+    'RequestMetric': 'metrics',
+    'ScraperMetrics': 'metrics',
+    'RateLimiter': 'ratelimit',
+    'SegmentStorage': 'storage',
+}
+
+__all__ = list(ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in ATTRIBUTES:
+        return getattr(importlib.import_module(f'.{ATTRIBUTES[name]}', __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
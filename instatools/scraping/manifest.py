@@ -0,0 +1,83 @@
+from pathlib import Path
+import sqlite3
+import threading
+from time import time
+
+
+class DownloadManifest:
+    """Persistent record of downloaded images stored in SQLite.
+
+    Keeps the post id, url, size in bytes and status of every image, so that
+    already downloaded images are skipped without scanning the directory.
+    A single instance may be shared between threads.
+
+    Args:
+        path (str): A path to the SQLite database file.
+
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS images ('
+                'id TEXT PRIMARY KEY, url TEXT, size INTEGER, '
+                'status TEXT NOT NULL, updated REAL NOT NULL)')
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def completed(self):
+        """Get ids of successfully downloaded images.
+
+        Returns:
+            set: Post ids.
+
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT id FROM images WHERE status = 'ok'")
+            return {id for id, in rows}
+
+    def record(self, id, url, status, size=None):
+        """Save the result of a download.
+
+        Args:
+            id (str): Post id.
+            url (str): Image url.
+            status (str): 'ok' if the image was saved, 'failed' otherwise.
+            size (int): Image size in bytes. Defaults to None.
+
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO images (id, url, size, status, updated) '
+                'VALUES (?, ?, ?, ?, ?)', (str(id), url, size, status, time()))
+
+    def import_files(self, paths):
+        """Record existing image files as downloaded.
+
+        Args:
+            paths (iterable): Paths to images named after post ids.
+
+        """
+        rows = [(path.stem, None, path.stat().st_size, 'ok', time()) for path in paths]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO images (id, url, size, status, updated) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,208 @@
+from collections import Counter, namedtuple
+import json
+import threading
+from time import monotonic
+
+RequestMetric = namedtuple('RequestMetric', [
+    'url', 'kind', 'status', 'latency', 'bytes', 'attempt', 'waited', 'error'])
+RequestMetric.__doc__ = """Measurements of a single HTTP request.
+
+Attributes:
+    url (str): Requested url.
+    kind (str): 'page' or 'image'.
+    status (int): Status code, None if no response was received.
+    latency (float): Time until the response headers arrived in seconds.
+    bytes (int): Size of the response body, None if unknown.
+    attempt (int): Number of the attempt, 0 for the first one.
+    waited (float): Time spent waiting for the rate limiter in seconds.
+    error (str): Name of the raised exception, None if there was none.
+"""
+
+
+class ScraperMetrics:
+    """Structured metrics of the requests sent by a scraper.
+
+    Every request is recorded as a RequestMetric and passed to the hooks,
+    e.g. to log it or to stop a crawl. Totals are kept for a summary and
+    can be exported as JSON or in the Prometheus text format.
+    A single instance may be shared between threads.
+
+    Attributes:
+        hooks (list): Callables receiving each RequestMetric.
+
+    """
+
+    def __init__(self):
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded metrics."""
+        with self._lock:
+            self._started = None
+            self._updated = None
+            self._requests = Counter()
+            self._bytes = Counter()
+            self._latencies = []
+            self._retries = 0
+            self._errors = Counter()
+            self._waited = 0.0
+            self._slept = 0.0
+            self._items = Counter()
+
+    def add_hook(self, hook):
+        """Call a function with the metrics of each request.
+
+        Args:
+            hook (callable): Receives a RequestMetric.
+
+        """
+        self.hooks.append(hook)
+
+    def record_request(self, metric):
+        """Record a request and pass it to the hooks.
+
+        Args:
+            metric (RequestMetric): Measurements of the request.
+
+        """
+        with self._lock:
+            self._touch(metric.latency + metric.waited)
+            self._requests[(metric.kind, metric.status)] += 1
+            self._bytes[metric.kind] += metric.bytes or 0
+            self._latencies.append(metric.latency)
+            self._retries += metric.attempt > 0
+            self._waited += metric.waited
+            if metric.error:
+                self._errors[metric.error] += 1
+        for hook in self.hooks:
+            hook(metric)
+
+    def record_sleep(self, seconds):
+        """Record a pause between requests, e.g. the delay of AsyncScraper."""
+        with self._lock:
+            self._slept += seconds
+
+    def record_item(self, kind):
+        """Record a retrieved page or image.
+
+        Args:
+            kind (str): 'page' or 'image'.
+
+        """
+        with self._lock:
+            self._touch()
+            self._items[kind] += 1
+
+    def summary(self):
+        """Summarise the recorded metrics.
+
+        Returns:
+            dict: Numbers of requests by kind and status, retries, errors,
+                bytes, latency statistics, time spent waiting and sleeping,
+                retrieved pages and images, and their rates per second.
+
+        """
+        with self._lock:
+            elapsed = (self._updated - self._started) if self._started else 0.0
+            latencies = sorted(self._latencies)
+            return {
+                'requests': sum(self._requests.values()),
+                'statuses': {f'{kind} {status}': count
+                             for (kind, status), count in sorted(
+                                 self._requests.items(), key=lambda item: str(item[0]))},
+                'retries': self._retries,
+                'errors': dict(self._errors),
+                'bytes': dict(self._bytes),
+                'latency': {
+                    'mean': sum(latencies) / len(latencies) if latencies else None,
+                    'p50': self._percentile(latencies, 0.5),
+                    'p95': self._percentile(latencies, 0.95),
+                    'max': latencies[-1] if latencies else None,
+                },
+                'waited_seconds': self._waited,
+                'slept_seconds': self._slept,
+                'elapsed_seconds': elapsed,
+                'pages': self._items['page'],
+                'images': self._items['image'],
+                'pages_per_second': self._items['page'] / elapsed if elapsed else None,
+                'images_per_second': self._items['image'] / elapsed if elapsed else None,
+            }
+
+    def to_json(self):
+        """Export the summary as JSON."""
+        return json.dumps(self.summary())
+
+    def to_prometheus(self, prefix='instatools_scraper'):
+        """Export the metrics in the Prometheus text format.
+
+        Args:
+            prefix (str): Prefix of the metric names.
+                Defaults to 'instatools_scraper'.
+
+        Returns:
+            str: Metrics ready to be served to Prometheus.
+
+        """
+        with self._lock:
+            lines = []
+
+            def metric(name, kind, help, samples):
+                lines.append(f'# HELP {prefix}_{name} {help}')
+                lines.append(f'# TYPE {prefix}_{name} {kind}')
+                for labels, value in samples:
+                    text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                    lines.append(f'{prefix}_{name}{{{text}}} {value}' if text
+                                 else f'{prefix}_{name} {value}')
+
+            metric('requests_total', 'counter', 'HTTP requests by kind and status.',
+                   [({'kind': kind, 'status': status or 'none'}, count)
+                    for (kind, status), count in self._requests.items()])
+            metric('retries_total', 'counter', 'Repeated requests.', [({}, self._retries)])
+            metric('errors_total', 'counter', 'Requests raising an exception.',
+                   [({'error': error}, count) for error, count in self._errors.items()])
+            metric('response_bytes_total', 'counter', 'Size of response bodies.',
+                   [({'kind': kind}, count) for kind, count in self._bytes.items()])
+            metric('request_latency_seconds', 'summary', 'Latency of HTTP requests.',
+                   [({'quantile': quantile},
+                     self._percentile(sorted(self._latencies), quantile) or 0)
+                    for quantile in (0.5, 0.95)])
+            lines.append(f'{prefix}_request_latency_seconds_sum {sum(self._latencies)}')
+            lines.append(f'{prefix}_request_latency_seconds_count {len(self._latencies)}')
+            metric('rate_limit_wait_seconds_total', 'counter',
+                   'Time spent waiting for the rate limiter.', [({}, self._waited)])
+            metric('sleep_seconds_total', 'counter', 'Pauses between requests.',
+                   [({}, self._slept)])
+            metric('items_total', 'counter', 'Retrieved pages and images.',
+                   [({'kind': kind}, count) for kind, count in self._items.items()])
+            return '\n'.join(lines) + '\n'
+
+    def _touch(self, duration=0.0):
+        """Helper method to update the time span of the metrics.
+
+        Args:
+            duration (float): Time the recorded event took, so that the
+                span starts when the first event began. Defaults to 0.
+
+        """
+        now = monotonic()
+        if self._started is None:
+            self._started = now - duration
+        self._updated = now
+
+    @staticmethod
+    def _percentile(values, quantile):
+        """Helper method to pick a percentile of sorted values.
+
+        Args:
+            values (list): Sorted values.
+            quantile (float): Between 0 and 1.
+
+        Returns:
+            float or None: The percentile, None if there are no values.
+
+        """
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(quantile * len(values)))]
@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    """Adaptive token bucket shared by all requests of a scraper.
+
+    Tokens are refilled at the current rate. After a failure (e.g. 429 or 5xx
+    response) the rate is decreased and all requests are paused, either for
+    the time requested by the server or with an exponential backoff with
+    jitter. After a run of successes the rate is increased again, up to
+    max_rate. A single instance may be shared between threads.
+
+    Args:
+        rate (float): Initial number of requests per second. None disables
+            pacing, while backoff after failures still applies.
+            Defaults to 0.5.
+        max_rate (float): Highest rate to speed up to. Defaults to four
+            times the initial rate, pass rate to keep it fixed.
+        min_rate (float): Lowest rate to slow down to. Defaults to 0.05.
+        burst (int): Maximum number of requests issued without pause.
+            Defaults to 1.
+        backoff (float): Base pause in seconds after the first failure,
+            doubled with each consecutive one. Defaults to 2.
+        max_backoff (float): Longest pause in seconds. Defaults to 300.
+        speedup_after (int): Number of consecutive successes needed to
+            increase the rate. Defaults to 20.
+
+    """
+
+    SPEEDUP = 1.25
+    SLOWDOWN = 0.5
+    MAX_SPEEDUP = 4
+
+    def __init__(self, rate=0.5, max_rate=None, min_rate=0.05, burst=1,
+                 backoff=2, max_backoff=300, speedup_after=20):
+        self.rate = rate
+        self.max_rate = max_rate or (rate and rate * self.MAX_SPEEDUP)
+        self.min_rate = min_rate
+        self.burst = burst
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.speedup_after = speedup_after
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated = monotonic()
+        self._paused_until = 0.0
+        self._successes = 0
+        self._failures = 0
+
+    def acquire(self):
+        """Block until the next request is allowed.
+
+        Returns:
+            float: Time spent waiting in seconds.
+
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = monotonic()
+                wait = self._paused_until - now
+                if wait <= 0 and self.rate:
+                    self._tokens = min(
+                        self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+                elif wait <= 0:
+                    return waited
+            sleep(wait)
+            waited += wait
+
+    def success(self):
+        """Record a successful request, speeding up after a run of them."""
+        with self._lock:
+            self._failures = 0
+            self._successes += 1
+            if self.rate and self._successes >= self.speedup_after:
+                self._successes = 0
+                self.rate = min(self.max_rate, self.rate * self.SPEEDUP)
+
+    def failure(self, retry_after=None):
+        """Record a throttled or failed request and pause all requests.
+
+        Args:
+            retry_after (str or float): Value of the Retry-After header,
+                either in seconds or as an HTTP date. Defaults to None.
+
+        Returns:
+            float: Length of the pause in seconds.
+
+        """
+        with self._lock:
+            self._successes = 0
+            self._failures += 1
+            if self.rate:
+                self.rate = max(self.min_rate, self.rate * self.SLOWDOWN)
+            pause = self._parse_retry_after(retry_after)
+            if pause is None:
+                pause = min(self.max_backoff, self.backoff * 2 ** (self._failures - 1))
+                pause *= random.uniform(0.5, 1)
+            self._paused_until = max(self._paused_until, monotonic() + pause)
+            self._tokens = 0
+            return pause
+
+    @staticmethod
+    def _parse_retry_after(retry_after):
+        """Helper method to convert the Retry-After header to seconds.
+
+        Args:
+            retry_after (str or float): Seconds or an HTTP date.
+
+        Returns:
+            float or None: Seconds to wait, None if missing or invalid.
+
+        """
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
@@ -1,15 +1,246 @@
-import itertools
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gzip
 import json
 import logging
+import os
 from pathlib import Path
+import re
 import shutil
-from time import sleep
+from time import monotonic
 import requests
+from urllib3.util.retry import Retry
+from .manifest import DownloadManifest
+from .metrics import RequestMetric, ScraperMetrics
+from .ratelimit import RateLimiter
+from .storage import SegmentStorage
 
-logging.basicConfig(filename='scraper.log',
-                    level=logging.INFO,
-                    format='%(asctime)s | %(levelname)s | %(message)s',
-                    datefmt='%Y-%m-%d %H:%M:%S',)
+LOG_FILE = 'scraper.log'
+CHECKPOINT_FILE = 'checkpoint'
+MANIFEST_FILE = 'manifest.sqlite'
+MIN_RESUME_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(file_name=LOG_FILE, level=logging.INFO):
+    """Write messages of the scrapers to a log file.
+
+    Called when the first scraper is created. Nothing is changed if
+    logging of the scrapers or the root logger is already configured.
+
+    Args:
+        file_name (str): A path to the log file. Defaults to 'scraper.log'.
+        level (int): Lowest level of logged messages. Defaults to INFO.
+
+    """
+    if logger.handlers or logging.getLogger().handlers:
+        return
+    handler = logging.FileHandler(file_name)
+    handler.setFormatter(logging.Formatter(
+        '%(asctime)s | %(levelname)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+class Checkpoint:
+    """Keep track of pagination for all urls extracted to one directory.
+
+    The checkpoint stores the number of the last saved page and, for each
+    url, the cursor, the newest post id and the status of every page.
+    The newest id seen by an incremental run is kept apart until the run
+    reaches already extracted posts, so an interrupted run is repeated.
+
+    Args:
+        posts_path (str): Directory to store the extracted JSON files.
+
+    """
+
+    def __init__(self, posts_path):
+        self.posts_path = Path(posts_path)
+        self.posts_path.mkdir(parents=True, exist_ok=True)
+        self.file_path = Path(self.posts_path, CHECKPOINT_FILE)
+        self._segments = None
+        if self.file_path.exists():
+            with open(self.file_path, 'r', encoding='utf8') as file:
+                self.content = json.load(file)
+        else:
+            pages = (path.name.split('.')[0] for path in self.posts_path.glob('*.json*'))
+            last_page = max([int(page) for page in pages if page.isdigit()]
+                            + self.segments.pages(), default=0)
+            self.content = {'last_page': last_page, 'targets': {}}
+
+    def paginate(self, base_url, resume=True, incremental=False):
+        """Start or resume pagination of base_url.
+
+        Args:
+            base_url (str): Full url to Instagram content.
+            resume (bool): Continue an interrupted crawl. Defaults to True.
+            incremental (bool): Fetch only posts newer than those already
+                extracted. Defaults to False.
+
+        Returns:
+            Pagination: Pagination state of base_url.
+
+        """
+        state = self.content['targets'].get(base_url)
+        done = False
+
+        if state is None or not resume:
+            state = {'max_id': '', 'complete': False, 'latest_id': None, 'pages': {}}
+            self.content['targets'][base_url] = state
+        elif state['complete'] and not incremental:
+            logger.info(f'Extraction already completed: {base_url}')
+            done = True
+
+        incremental = incremental and state['latest_id'] is not None
+        return Pagination(self, base_url, state, incremental, done)
+
+    @property
+    def segments(self):
+        """SegmentStorage: Compressed segments in the output directory."""
+        if self._segments is None:
+            self._segments = SegmentStorage(self.posts_path)
+        return self._segments
+
+    def next_page(self):
+        """Reserve the number of the next page to save."""
+        self.content['last_page'] += 1
+        return self.content['last_page']
+
+    def save(self):
+        """Atomically write the checkpoint to disk."""
+        temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf8') as file:
+            json.dump(self.content, file)
+        os.replace(temp_path, self.file_path)
+
+
+class Pagination:
+    """Cursor pagination of a single url tracked by a checkpoint.
+
+    Args:
+        checkpoint (Checkpoint): Checkpoint of the output directory.
+        base_url (str): Full url to Instagram content.
+        state (dict): Crawl state of base_url stored in the checkpoint.
+        incremental (bool): Stop at the first page with a known post.
+        done (bool): Whether there is nothing left to extract.
+
+    """
+
+    def __init__(self, checkpoint, base_url, state, incremental=False, done=False):
+        self.checkpoint = checkpoint
+        self.base_url = base_url
+        self.state = state
+        self.incremental = incremental
+        self.done = done
+        self.max_id = '' if incremental else state['max_id']
+        self.page = checkpoint.content['last_page'] + 1
+        self._known_id = state['latest_id'] if incremental else None
+
+    @property
+    def url(self):
+        """Url of the next page to retrieve."""
+        if self.max_id:
+            return f"{self.base_url}?__a=1&max_id={self.max_id}"
+        return f"{self.base_url}?__a=1"
+
+    def fail(self):
+        """Record a failed attempt to retrieve the next page."""
+        self.state['pages'][str(self.page)] = {'status': 'failed', 'cursor': self.max_id}
+        self.checkpoint.save()
+
+    def save(self, content, archive='json'):
+        """Save a retrieved page and advance the cursor.
+
+        Args:
+            content (dict): API response.
+            archive (str): Format of the saved page, 'json' for N.json,
+                'gzip' for N.json.gz, 'segments' to append it to compressed
+                JSON Lines segments or None to only advance the cursor.
+                Defaults to 'json'.
+
+        """
+        page = self.checkpoint.next_page()
+        if archive == 'json':
+            file_name = Path(self.checkpoint.posts_path, str(page) + '.json')
+            with open(file_name, "w", encoding='utf8') as file:
+                json.dump(content, file, ensure_ascii=False)
+        elif archive == 'gzip':
+            file_name = Path(self.checkpoint.posts_path, str(page) + '.json.gz')
+            with gzip.open(file_name, "wt", encoding='utf8') as file:
+                json.dump(content, file, ensure_ascii=False)
+        elif archive == 'segments':
+            self.checkpoint.segments.append(page, content)
+        elif archive is not None:
+            raise ValueError(f'Unsupported archive format: {archive}')
+
+        recent = self._recent_section(content)
+        ids = self._media_ids(recent)
+        self.max_id = recent.get('next_max_id')
+
+        self.state['pages'][str(page)] = {'status': 'ok', 'cursor': self.max_id}
+        reached_known = self._known_id is not None and any(
+            id <= self._known_id for id in ids)
+        if ids:
+            key = 'pending_id' if self.incremental else 'latest_id'
+            self.state[key] = max(ids + [self.state.get(key) or 0])
+        if self.incremental and (reached_known or not self.max_id):
+            self.state['latest_id'] = max(self.state['latest_id'],
+                                          self.state.pop('pending_id', None) or 0)
+        if not self.incremental:
+            self.state['max_id'] = self.max_id
+            self.state['complete'] = not self.max_id
+        self.checkpoint.save()
+
+        self.page = self.checkpoint.content['last_page'] + 1
+        self.done = not self.max_id or reached_known
+
+    def _recent_section(self, content):
+        """Helper method to get the section with recent posts from an API page.
+
+        Args:
+            content (dict): API response.
+
+        Returns:
+            dict: Recent posts section, empty for unknown endpoints.
+
+        """
+        if '/tags/' in self.base_url:
+            return content['data']['recent']
+        elif '/locations/' in self.base_url:
+            return content['native_location_data']['recent']
+        return {}
+
+    def parse(self, content):
+        """Parse posts from a retrieved page.
+
+        Args:
+            content (dict): API response.
+
+        Returns:
+            list of tuples: Post ids and post contents, as in Posts.
+
+        """
+        from ..preprocessing.preprocessing import Posts
+        return [Posts._extract_post(media)
+                for section in self._recent_section(content).get('sections', [])
+                for media in section['layout_content']['medias']]
+
+    @staticmethod
+    def _media_ids(recent):
+        """Helper method to list post ids from the recent posts section.
+
+        Args:
+            recent (dict): Recent posts section of an API page.
+
+        Returns:
+            list of int: Post ids.
+
+        """
+        return [int(media['media']['pk'])
+                for section in recent.get('sections', [])
+                for media in section['layout_content']['medias']]
 
 
 class Scraper:
@@ -20,6 +251,8 @@ class Scraper:
         session_id (str): Obtained from the browser's cookie,
             user must be logged in with their Instagram account.
         session_path (str): Directory to store the extracted content.
+        metrics (ScraperMetrics): Latency, status, size and retries of
+            every request, with hooks and exporters.
 
     Methods:
         set_api_session: Set up the Requests package session
@@ -31,114 +264,475 @@ class Scraper:
     """
 
     def __init__(self, session_id, session_path):
+        configure_logging()
         self.session_id = session_id
         self.session_path = session_path
         self._session = None
         self._headers = None
         self._timeout = 0
+        self._throttle_retries = 0
+        self._max_retries = 0
+        self._pool_connections = 0
+        self._pool_maxsize = 0
+        self._pool_block = False
         self._api_endpoint = None
+        self.rate_limiter = None
+        self.metrics = ScraperMetrics()
 
-    def set_api_session(self, timeout=3, max_retries=2):
+    def set_api_session(self, timeout=3, max_retries=2, throttle_retries=3,
+                        rate_limiter=None, pool_connections=10, pool_maxsize=10,
+                        pool_block=False):
         """Set up the Requests package session to access Instagram API.
 
-        Provides authorization between consecutive requests.
+        Provides authorization between consecutive requests. Connections to
+        the API and to the CDN hosts serving images are kept alive in
+        separate pools and reused by all threads sharing the session.
 
         Args:
             timeout (int): Default value = 3.
             max_retries (int): Default value = 2.
+            throttle_retries (int): Number of additional attempts after
+                a 429 or 5xx response or a connection error. Default value = 3.
+            rate_limiter (RateLimiter): Limiter pacing all requests,
+                shared between threads. Defaults to a new RateLimiter
+                starting at 0.5 requests per second and speeding up to
+                2 after runs of successes. Pass RateLimiter(rate, max_rate)
+                to allow more, e.g. for many download workers.
+            pool_connections (int): Number of hosts to keep connection
+                pools for. Default value = 10.
+            pool_maxsize (int): Maximum number of connections kept alive
+                per host. It is raised automatically to the number of
+                concurrent workers. Default value = 10.
+            pool_block (bool): Wait for a free connection instead of opening
+                a new one when the pool of a host is full. Default value = False.
 
         """
-        adapter = requests.adapters.HTTPAdapter(max_retries=max_retries)
         self._session = requests.Session()
         self._session.cookies['sessionid'] = self.session_id
-        self._session.mount('https://www.instagram.com/', adapter)
+        self._max_retries = max_retries
+        self._pool_connections = pool_connections
+        self._pool_block = pool_block
+        self._mount_adapters(pool_maxsize)
         self._headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'
         }
         self._timeout = timeout
+        self._throttle_retries = throttle_retries
+        self.rate_limiter = rate_limiter or self._default_rate_limiter()
         return self
 
-    def extract_posts(self, base_url):
+    def _default_rate_limiter(self):
+        """Helper method to create the rate limiter used by default."""
+        return RateLimiter()
+
+    def _mount_adapters(self, pool_maxsize):
+        """Helper method to set up connection pools for API and CDN hosts.
+
+        Plain http urls, e.g. of a local stand-in of the API, share
+        the same settings. Only broken connections are retried by the
+        adapters, throttled responses are left to _get and its rate limiter.
+
+        Args:
+            pool_maxsize (int): Maximum number of connections per host.
+
+        """
+        self._pool_maxsize = pool_maxsize
+        for prefix in ['https://www.instagram.com/', 'https://', 'http://']:
+            previous = self._session.adapters.get(prefix)
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self._pool_connections, pool_maxsize=pool_maxsize,
+                max_retries=Retry(total=self._max_retries, read=False,
+                                  respect_retry_after_header=False),
+                pool_block=self._pool_block)
+            self._session.mount(prefix, adapter)
+            if previous is not None:
+                previous.close()
+
+    def _ensure_pool_size(self, workers):
+        """Helper method to keep a connection alive for each worker.
+
+        Args:
+            workers (int): Number of threads sharing the session.
+
+        """
+        if workers > self._pool_maxsize:
+            self._mount_adapters(workers)
+
+    def _get(self, url, rate_limiter=None, kind='page', **kwargs):
+        """Helper method to send a rate limited GET request.
+
+        Throttled (429), failed (5xx) and broken requests are retried after
+        a backoff, as long as attempts are left. Each attempt is recorded
+        in the metrics.
+
+        Args:
+            url (str): Requested url.
+            rate_limiter (RateLimiter): Limiter to use instead of the
+                default one. Defaults to None.
+            kind (str): 'page' or 'image', used by the metrics.
+                Defaults to 'page'.
+            **kwargs: Passed to requests.Session.get, headers are added
+                to the default ones.
+
+        Returns:
+            requests.Response: Successful response.
+
+        Raises:
+            requests.RequestException: If the request failed.
+
+        """
+        rate_limiter = rate_limiter or self.rate_limiter
+        headers = {**self._headers, **kwargs.pop('headers', {})}
+        for attempt in range(self._throttle_retries + 1):
+            last_attempt = attempt == self._throttle_retries
+            waited = rate_limiter.acquire()
+            start = monotonic()
+            try:
+                response = self._session.get(
+                    url, headers=headers, timeout=self._timeout, **kwargs)
+            except requests.RequestException as error:
+                self.metrics.record_request(RequestMetric(
+                    url, kind, None, monotonic() - start, None, attempt, waited,
+                    type(error).__name__))
+                rate_limiter.failure()
+                if last_attempt:
+                    raise
+                continue
+
+            size = response.headers.get('Content-Length')
+            self.metrics.record_request(RequestMetric(
+                url, kind, response.status_code, monotonic() - start,
+                int(size) if size is not None else None, attempt, waited, None))
+
+            if response.status_code == 429 or response.status_code >= 500:
+                rate_limiter.failure(response.headers.get('Retry-After'))
+                response.close()
+                if last_attempt:
+                    response.raise_for_status()
+                continue
+
+            if not response.ok:
+                response.close()
+            response.raise_for_status()
+            rate_limiter.success()
+            return response
+
+    def extract_posts(self, base_url, resume=True, incremental=False, sink=None,
+                      archive='json'):
         """Retrieve posts from Instagram API.
 
-        Results are stored in batches of ~60 posts in JSON files.
+        Results are stored in batches of ~60 posts in JSON files. The cursor,
+        page index and status of every page are kept in a checkpoint file
+        next to the batches, so an interrupted crawl continues from the last
+        good page. Batch numbering continues after existing files, which
+        are never overwritten.
 
         Args:
             base_url (str): Full url to Instagram content,
                 e.g. 'https://www.instagram.com/explore/tags/medialabkatowice/'
+            resume (bool): Continue an interrupted crawl of base_url from
+                its checkpoint. A finished crawl is not repeated unless
+                it is False. Defaults to True.
+            incremental (bool): Fetch only posts newer than those already
+                extracted, stopping at the first page with a known post.
+                Defaults to False.
+            sink (callable): Called with a list of parsed post ids and
+                contents for each page, e.g. Posts.update. Defaults to None.
+            archive (str): Format of the stored batches, 'json', 'gzip',
+                'segments' or None to skip storing them. Defaults to 'json'.
 
         """
-        Path(self.session_path, 'posts', self._api_endpoint).mkdir(parents=True, exist_ok=True)
-        max_id = ''
+        for pagination, response_content in self._iter_pages(
+                base_url, resume, incremental, archive):
+            if sink is not None:
+                sink(pagination.parse(response_content))
+
+    def iter_posts(self, base_url, resume=True, incremental=False, archive='json'):
+        """Retrieve posts from Instagram API as they arrive.
+
+        Works like extract_posts, but yields parsed posts, so they can be
+        analysed without reading the stored batches again.
+
+        Args:
+            base_url (str): Full url to Instagram content.
+            resume (bool): Continue an interrupted crawl. Defaults to True.
+            incremental (bool): Fetch only posts newer than those already
+                extracted. Defaults to False.
+            archive (str): Format of the stored batches, 'json', 'gzip',
+                'segments' or None to skip storing them. Defaults to 'json'.
 
-        for i in itertools.count(start=1):
+        Yields:
+            tuple of str and dict: Post id and post content.
 
-            if max_id:
-                url = f"{base_url}?__a=1&max_id={max_id}"
-            else:
-                url = f"{base_url}?__a=1"
+        """
+        for pagination, response_content in self._iter_pages(
+                base_url, resume, incremental, archive):
+            yield from pagination.parse(response_content)
+
+    def _iter_pages(self, base_url, resume, incremental, archive):
+        """Helper generator retrieving consecutive pages of posts.
+
+        A page is saved and checkpointed after it is consumed.
+
+        Args:
+            base_url (str): Full url to Instagram content.
+            resume (bool): Continue an interrupted crawl.
+            incremental (bool): Fetch only posts newer than those already
+                extracted.
+            archive (str): Format of the stored batches.
 
+        Yields:
+            tuple of Pagination and dict: Pagination state and API response.
+
+        """
+        posts_path = Path(self.session_path, 'posts', self._api_endpoint)
+        checkpoint = Checkpoint(posts_path)
+        pagination = checkpoint.paginate(base_url, resume, incremental)
+
+        while not pagination.done:
             try:
-                response = self._session.get(url, headers=self._headers, timeout=self._timeout)
-                response.raise_for_status()
-                response_content = response.json()
+                response_content = self._request_page(pagination.url)
             except Exception:
-                logging.info(f'API Response & parsing, {i} interation', exc_info=True)
+                logger.info(f'API Response & parsing, {pagination.page} interation',
+                            exc_info=True)
+                pagination.fail()
+                break
 
-            file_name = Path(self.session_path, 'posts', self._api_endpoint, str(i) + '.json')
-            with open(file_name, "w", encoding='utf8') as file:
-                json.dump(response_content, file, ensure_ascii=False)
+            yield pagination, response_content
+            pagination.save(response_content, archive)
+            self.metrics.record_item('page')
 
-            if '/tags/' in base_url:
-                max_id = response_content['data']['recent'].get('next_max_id')
+    def _request_page(self, url):
+        """Helper method to retrieve a single page of posts.
 
-            elif '/locations/' in base_url:
-                max_id = response_content['native_location_data']['recent'].get('next_max_id')
-            if not max_id or max_id is None:
-                break
+        Args:
+            url (str): Full url to the API page.
 
-            sleep(2)
+        Returns:
+            dict: Parsed API response.
 
-    def _request_image(self, url, file_name):
+        """
+        return self._get(url).json()
+
+    def _request_image(self, url, file_name, rate_limiter=None):
         """Helper method to retrieve an image (jpg) from Instagram API.
 
+        The image is written to a temporary file, which is renamed once
+        its size and format are verified. A partially downloaded image
+        is resumed with a Range request if the server supports it.
+        A temporary file which already holds the whole image is renamed
+        only after the server confirms its size.
+
         Args:
             url (str): Path to the image extracted from Instagram post.
             file_name (str): Output file name coresponding to the post id.
+            rate_limiter (RateLimiter): Limiter to use instead of the
+                default one. Defaults to None.
+
+        Returns:
+            int or None: Size of the saved image in bytes, None if failed.
+
+        Raises:
+            requests.HTTPError: If the image is permanently unavailable,
+                e.g. after a 403 or 404 response.
 
         """
+        file_path = Path(self.session_path, 'images', str(file_name) + '.jpg')
+        part_path = file_path.with_name(file_path.name + '.part')
+        offset = part_path.stat().st_size if part_path.exists() else 0
+
         try:
-            response = self._session.get(
-                url, stream=True, headers=self._headers, timeout=self._timeout)
-            response.raise_for_status()
-        except Exception:
-            logging.info(f'API Response, filename: {file_name}', exc_info=True)
+            expected_size = self._download_part(url, part_path, offset, rate_limiter)
+        except Exception as error:
+            logger.info(f'API Response, filename: {file_name}', exc_info=True)
+            if self._is_permanent(error):
+                raise
+            return None
+
+        size = part_path.stat().st_size
+        if size < expected_size:
+            logger.info(f'Incomplete image, filename: {file_name}, {size}/{expected_size} bytes')
+            return None
+        if (expected_size and size > expected_size) or not self._is_jpeg(part_path):
+            logger.info(f'Invalid image, filename: {file_name}')
+            part_path.unlink()
+            return None
+
+        os.replace(part_path, file_path)
+        return size
+
+    def _download_part(self, url, part_path, offset, rate_limiter):
+        """Helper method to write an image to a temporary file.
 
-        file_path = Path(self.session_path, 'images', str(file_name) + '.jpg')
-        with open(file_path, 'wb') as file:
+        Args:
+            url (str): Path to the image extracted from Instagram post.
+            part_path (Path): Temporary file holding offset bytes
+                of the image.
+            offset (int): Size of the temporary file, 0 if missing.
+            rate_limiter (RateLimiter): Limiter to use instead of the
+                default one.
+
+        Returns:
+            int: Full size of the image in bytes, 0 if the server
+                did not send it.
+
+        """
+        resume = offset >= MIN_RESUME_SIZE
+        try:
+            response = self._get(url, rate_limiter, kind='image', stream=True,
+                                 headers={'Range': f'bytes={offset}-'} if resume else {})
+        except requests.HTTPError as error:
+            if not resume or error.response.status_code != 416:
+                raise
+            match = re.fullmatch(r'bytes \*/(\d+)', error.response.headers.get('Content-Range', ''))
+            if match and int(match[1]) == offset:
+                return offset
+            part_path.unlink()
+            return self._download_part(url, part_path, 0, rate_limiter)
+
+        expected_size = self._expected_size(response, offset) if resume else None
+        if expected_size is None:
+            resume, expected_size = False, self._expected_size(response, 0)
+        with response, open(part_path, 'ab' if resume else 'wb') as file:
             shutil.copyfileobj(response.raw, file)
+        return expected_size
+
+    @staticmethod
+    def _expected_size(response, offset):
+        """Helper method to get the full size of a requested image.
+
+        Args:
+            response (requests.Response): Response to a regular or
+                a Range request.
+            offset (int): First requested byte, 0 for a regular request.
+
+        Returns:
+            int or None: Size in bytes, None if a Range request was not
+                honoured. 0 if the server did not send the size.
+
+        """
+        if offset:
+            content_range = response.headers.get('Content-Range', '')
+            match = re.fullmatch(r'bytes (\d+)-\d+/(\d+)', content_range)
+            if response.status_code != 206 or not match or int(match[1]) != offset:
+                return None
+            return int(match[2])
+        return int(response.headers.get('Content-Length', 0))
+
+    @staticmethod
+    def _is_jpeg(file_path):
+        """Helper method to check that a file contains a complete JPEG image.
+
+        Args:
+            file_path (str): A path to the image.
+
+        Returns:
+            bool: True if the file starts and ends with JPEG markers.
 
-    def extract_images(self, posts):
+        """
+        with open(file_path, 'rb') as file:
+            start = file.read(3)
+            file.seek(max(0, Path(file_path).stat().st_size - 2))
+            end = file.read()
+        return start == b'\xff\xd8\xff' and end == b'\xff\xd9'
+
+    @staticmethod
+    def _is_permanent(error):
+        """Helper method to check if a failed request is not worth repeating.
+
+        Args:
+            error (Exception): Raised exception.
+
+        Returns:
+            bool: True for 4xx responses other than 429.
+
+        """
+        response = getattr(error, 'response', None)
+        return (isinstance(error, requests.HTTPError) and response is not None
+                and 400 <= response.status_code < 500 and response.status_code != 429)
+
+    def _download_image(self, url, file_name, rate_limiter, retries, manifest):
+        """Helper method to retrieve an image, retrying failed attempts.
+
+        Only throttled, failed (5xx), broken and incomplete downloads are
+        retried, permanent failures are recorded right away.
+
+        Args:
+            url (str): Path to the image extracted from Instagram post.
+            file_name (str): Output file name coresponding to the post id.
+            rate_limiter (RateLimiter): Limiter shared by all workers.
+            retries (int): Number of additional attempts after a failure.
+            manifest (DownloadManifest): Record of downloaded images.
+
+        Returns:
+            bool: True if the image was saved, False otherwise.
+
+        """
+        for _ in range(retries + 1):
+            try:
+                size = self._request_image(url, file_name, rate_limiter)
+            except requests.HTTPError:
+                break
+            if size is not None:
+                manifest.record(file_name, url, 'ok', size)
+                self.metrics.record_item('image')
+                return True
+        manifest.record(file_name, url, 'failed')
+        return False
+
+    def extract_images(self, posts, workers=1, max_rps=None, retries=2):
         """Retrieve images from Instagram posts.
 
-        Checks recursively for already downloaded images to facilitate
-        extraction in batches.
+        Downloaded images are recorded in a manifest, which makes it
+        possible to extract them in batches. On the first run, images
+        already present in session_path are added to the manifest.
+        Images are downloaded by a pool of worker threads sharing a single
+        rate limiter.
 
         Args:
             posts (dict): Collection of preprocessed posts.
+            workers (int): Number of concurrent downloads. Defaults to 1.
+            max_rps (float): Maximum number of requests per second across
+                all workers. If None, the rate limiter of the session
+                is used. Defaults to None.
+            retries (int): Number of additional attempts for each failed
+                image. Defaults to 2.
+
+        Returns:
+            dict: Number of images that 'succeeded', 'failed' and
+                were 'skipped' as already downloaded or missing an url.
 
         """
         Path(self.session_path, 'images').mkdir(parents=True, exist_ok=True)
-        image_paths = Path(self.session_path).glob('**/*.jpg')
-        extracted_images = [path.stem for path in image_paths]
-
-        for id, post in posts.items():
-            id = id
-            img_url = post['display_url']
-
-            if id not in extracted_images:
-                self._request_image(img_url, id)
-                sleep(2)
+        manifest_path = Path(self.session_path, 'images', MANIFEST_FILE)
+        is_new = not manifest_path.exists()
+        report = {'succeeded': 0, 'failed': 0, 'skipped': 0}
+
+        with DownloadManifest(manifest_path) as manifest:
+            if is_new:
+                manifest.import_files(path for path in Path(self.session_path).glob('**/*.jpg')
+                                      if self._is_jpeg(path))
+            extracted_images = manifest.completed()
+
+            to_download = []
+            for id, post in posts.items():
+                img_url = post.get('display_url')
+                if id in extracted_images or not img_url:
+                    report['skipped'] += 1
+                else:
+                    to_download.append((img_url, id))
+
+            rate_limiter = RateLimiter(max_rps, max_rate=max_rps) if max_rps else self.rate_limiter
+            self._ensure_pool_size(workers)
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                results = executor.map(
+                    lambda item: self._download_image(*item, rate_limiter, retries, manifest),
+                    to_download)
+                for success in results:
+                    report['succeeded' if success else 'failed'] += 1
+
+        logger.info(f'Images extracted: {report}')
+        return report
 
 
 class HashtagScraper(Scraper):
@@ -169,3 +763,154 @@ class LocationScraper(Scraper):
     def __init__(self, session_id, session_path):
         super().__init__(session_id, session_path)
         self._api_endpoint = 'location'
+
+
+class AsyncScraper(Scraper):
+    """Retrieve posts from Instragram API for many hashtags and locations at once.
+
+    Urls are paginated concurrently and their batches are stored in the same
+    directories as with HashtagScraper and LocationScraper.
+
+    Attributes:
+        session_id (str): Obtained from the browser's cookie,
+            user must be logged in with their Instagram account.
+        session_path (str): Directory to store the extracted content.
+        max_concurrency (int): Maximum number of requests in flight
+            across all urls. Defaults to 8.
+        delay (float): Pause in seconds between consecutive requests
+            for the same url. Defaults to 2.
+
+    """
+
+    ENDPOINTS = {'/tags/': 'hashtag', '/locations/': 'location'}
+
+    def __init__(self, session_id, session_path, max_concurrency=8, delay=2):
+        super().__init__(session_id, session_path)
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+
+    def _default_rate_limiter(self):
+        """Helper method to create the rate limiter used by default.
+
+        Requests are paced by the per-url delay, so the shared limiter
+        only backs off after failures.
+
+        """
+        return RateLimiter(rate=None)
+
+    def extract_posts(self, targets, resume=True, incremental=False, sink=None,
+                      archive='json'):
+        """Retrieve posts from Instagram API for multiple urls.
+
+        Blocking wrapper around crawl, see its description for details.
+        It cannot be called inside a running event loop, e.g. in a Jupyter
+        notebook, where `await scraper.crawl(targets)` should be used instead.
+
+        Args:
+            targets (list): Full urls to Instagram content.
+            resume (bool): Continue interrupted crawls. Defaults to True.
+            incremental (bool): Fetch only posts newer than those already
+                extracted. Defaults to False.
+            sink (callable): Called with a list of parsed post ids and
+                contents for each page. Defaults to None.
+            archive (str): Format of the stored batches, 'json', 'gzip',
+                'segments' or None to skip storing them. Defaults to 'json'.
+
+        """
+        asyncio.run(self.crawl(targets, resume, incremental, sink, archive))
+
+    def iter_posts(self, *args, **kwargs):
+        """Not supported, posts of many urls arrive concurrently.
+
+        Raises:
+            NotImplementedError: Always, pass a sink to extract_posts
+                or crawl instead.
+
+        """
+        raise NotImplementedError(
+            'AsyncScraper does not support iter_posts, pass a sink to extract_posts or crawl')
+
+    async def crawl(self, targets, resume=True, incremental=False, sink=None,
+                    archive='json'):
+        """Retrieve posts from Instagram API for multiple urls concurrently.
+
+        Args:
+            targets (list): Full urls to Instagram content, e.g.
+                'https://www.instagram.com/explore/tags/medialabkatowice/'
+            resume (bool): Continue interrupted crawls. Defaults to True.
+            incremental (bool): Fetch only posts newer than those already
+                extracted. Defaults to False.
+            sink (callable): Called with a list of parsed post ids and
+                contents for each page, e.g. Posts.update. Defaults to None.
+            archive (str): Format of the stored batches, 'json', 'gzip',
+                'segments' or None to skip storing them. Defaults to 'json'.
+
+        Raises:
+            TypeError: If a single url is passed instead of a list.
+
+        """
+        if isinstance(targets, str):
+            raise TypeError('targets must be a list of urls, not a single url')
+        checkpoints = dict()
+        paginations = []
+        for base_url in dict.fromkeys(targets):
+            endpoint = self._endpoint(base_url)
+            if endpoint not in checkpoints:
+                checkpoints[endpoint] = Checkpoint(
+                    Path(self.session_path, 'posts', endpoint))
+            paginations.append(
+                checkpoints[endpoint].paginate(base_url, resume, incremental))
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ensure_pool_size(self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            await asyncio.gather(*[
+                self._paginate(pagination, semaphore, executor, sink, archive)
+                for pagination in paginations])
+
+    async def _paginate(self, pagination, semaphore, executor, sink, archive):
+        """Helper coroutine to retrieve all pages of a single url.
+
+        Args:
+            pagination (Pagination): Pagination state of the url.
+            semaphore (asyncio.Semaphore): Global limit of requests in flight.
+            executor (ThreadPoolExecutor): Threads performing the requests.
+            sink (callable): Called with parsed posts of each page.
+            archive (str): Format of the stored batches.
+
+        """
+        loop = asyncio.get_running_loop()
+        while not pagination.done:
+            async with semaphore:
+                try:
+                    response_content = await loop.run_in_executor(
+                        executor, self._request_page, pagination.url)
+                except Exception:
+                    logger.info(f'API Response & parsing, {pagination.base_url}',
+                                exc_info=True)
+                    pagination.fail()
+                    return
+
+            if sink is not None:
+                sink(pagination.parse(response_content))
+            pagination.save(response_content, archive)
+            self.metrics.record_item('page')
+            if not pagination.done:
+                self.metrics.record_sleep(self.delay)
+                await asyncio.sleep(self.delay)
+
+    @classmethod
+    def _endpoint(cls, base_url):
+        """Helper method to match a url with its API endpoint.
+
+        Args:
+            base_url (str): Full url to Instagram content.
+
+        Returns:
+            str: Name of the endpoint directory.
+
+        """
+        for pattern, endpoint in cls.ENDPOINTS.items():
+            if pattern in base_url:
+                return endpoint
+        raise ValueError(f'Unsupported url: {base_url}')
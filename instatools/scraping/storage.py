@@ -0,0 +1,208 @@
+import gzip
+import json
+import os
+from pathlib import Path
+import zlib
+
+SEGMENT_INDEX_FILE = 'segments.index'
+SEGMENT_MAX_SIZE = 64 * 1024 * 1024
+SCAN_CHUNK = 64 * 1024
+
+
+class SegmentStorage:
+    """Append-only storage of API pages in compressed JSON Lines segments.
+
+    Each page is written as one line compressed into a separate gzip member,
+    so a segment can be read sequentially with gzip.open and a single page
+    can be read directly using the index of page offsets. A new segment
+    is started once the current one exceeds max_size. Segments missing
+    from the index, e.g. copied from another directory, are scanned and
+    indexed as they are.
+
+    Args:
+        posts_path (str): Directory to store the segments.
+        max_size (int): Size of a segment in bytes after which a new one
+            is started. Defaults to 64 MiB.
+
+    """
+
+    def __init__(self, posts_path, max_size=SEGMENT_MAX_SIZE):
+        self.posts_path = Path(posts_path)
+        self.max_size = max_size
+        self.index_path = Path(self.posts_path, SEGMENT_INDEX_FILE)
+        self.index = self._load_index()
+        self._truncate_unindexed()
+        self._index_segments()
+
+    def __len__(self):
+        return len(self.index)
+
+    def pages(self):
+        """List numbers of the stored pages."""
+        return list(self.index)
+
+    def append(self, page, content):
+        """Append a page to the current segment.
+
+        Args:
+            page (int): Page number.
+            content (dict): API response.
+
+        """
+        data = gzip.compress(
+            (json.dumps(content, ensure_ascii=False) + '\n').encode('utf8'))
+        segment = self._current_segment(len(data))
+        segment_path = Path(self.posts_path, segment)
+        with open(segment_path, 'ab') as file:
+            offset = file.tell()
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+        with open(self.index_path, 'a', encoding='utf8') as file:
+            file.write(f'{page}\t{segment}\t{offset}\t{len(data)}\n')
+            file.flush()
+            os.fsync(file.fileno())
+        self.index[page] = (segment, offset, len(data))
+
+    def read(self, page):
+        """Read a single page.
+
+        Args:
+            page (int): Page number.
+
+        Returns:
+            dict: API response.
+
+        """
+        segment, offset, length = self.index[page]
+        with open(Path(self.posts_path, segment), 'rb') as file:
+            file.seek(offset)
+            data = file.read(length)
+        return json.loads(gzip.decompress(data))
+
+    def _current_segment(self, size):
+        """Helper method to pick the segment for a new page.
+
+        Args:
+            size (int): Size of the compressed page in bytes.
+
+        Returns:
+            str: Segment file name.
+
+        """
+        segments = sorted(path.name for path in self.posts_path.glob('segment-*.jsonl.gz'))
+        if not segments:
+            return f'segment-{1:05d}.jsonl.gz'
+        last = segments[-1]
+        last_size = Path(self.posts_path, last).stat().st_size
+        if last_size == self._indexed_end(last) and last_size + size <= self.max_size:
+            return last
+        number = int(last.split('-')[1].split('.')[0]) + 1
+        return f'segment-{number:05d}.jsonl.gz'
+
+    def _load_index(self):
+        """Helper method to load page offsets.
+
+        A last line cut off by an interrupted write is removed from the
+        file, so that the next line is appended after a complete one.
+
+        Returns:
+            dict: Mapping of page numbers to segment names, offsets
+                and lengths.
+
+        """
+        index = dict()
+        if not self.index_path.exists():
+            return index
+        data = self.index_path.read_bytes()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            with open(self.index_path, 'r+b') as file:
+                file.truncate(end)
+        for line in data[:end].decode('utf8').splitlines():
+            fields = line.split('\t')
+            if len(fields) == 4:
+                index[int(fields[0])] = (fields[1], int(fields[2]), int(fields[3]))
+        return index
+
+    def _indexed_end(self, segment):
+        """Helper method to find the end of the last indexed page of a segment.
+
+        Args:
+            segment (str): Segment file name.
+
+        Returns:
+            int: Offset in bytes, 0 if the segment is not indexed.
+
+        """
+        return max((offset + length for name, offset, length in self.index.values()
+                    if name == segment), default=0)
+
+    def _truncate_unindexed(self):
+        """Helper method to drop data written after the last indexed page.
+
+        Removes a page whose write was interrupted before it was indexed,
+        which would otherwise corrupt sequential reading of the segment.
+        Segments without indexed pages are left untouched.
+
+        """
+        for segment in {segment for segment, _, _ in self.index.values()}:
+            segment_path = Path(self.posts_path, segment)
+            end = self._indexed_end(segment)
+            if segment_path.exists() and segment_path.stat().st_size > end:
+                with open(segment_path, 'r+b') as file:
+                    file.truncate(end)
+
+    def _index_segments(self):
+        """Helper method to index pages of segments missing from the index.
+
+        The pages are numbered after the highest indexed page. A page
+        truncated at the end of such a segment is not indexed, and new
+        pages are appended to a new segment.
+
+        """
+        indexed = {segment for segment, _, _ in self.index.values()}
+        for segment_path in sorted(self.posts_path.glob('segment-*.jsonl.gz')):
+            if segment_path.name in indexed:
+                continue
+            members = self._scan_members(segment_path)
+            if not members:
+                continue
+            with open(self.index_path, 'a', encoding='utf8') as file:
+                for offset, length in members:
+                    page = max(self.index, default=0) + 1
+                    file.write(f'{page}\t{segment_path.name}\t{offset}\t{length}\n')
+                    self.index[page] = (segment_path.name, offset, length)
+                file.flush()
+                os.fsync(file.fileno())
+
+    @staticmethod
+    def _scan_members(segment_path):
+        """Helper method to find complete gzip members of a segment.
+
+        Args:
+            segment_path (Path): Segment file.
+
+        Returns:
+            list of tuples: Offsets and lengths of the members in bytes.
+
+        """
+        data = memoryview(segment_path.read_bytes())
+        members = []
+        offset = 0
+        while offset < len(data):
+            decompressor = zlib.decompressobj(wbits=31)
+            position = offset
+            try:
+                while not decompressor.eof and position < len(data):
+                    decompressor.decompress(data[position:position + SCAN_CHUNK])
+                    position = min(position + SCAN_CHUNK, len(data))
+            except zlib.error:
+                break
+            if not decompressor.eof:
+                break
+            end = position - len(decompressor.unused_data)
+            members.append((offset, end - offset))
+            offset = end
+        return members
@@ -0,0 +1,34 @@
+from benchmarks.corpus import write_categories, write_corpus
+from benchmarks.preprocessing import compare
+from instatools.preprocessing.preprocessing import HashtagPosts, LocationPosts
+
+
+class SyntheticCorpusTests:
+
+    def test_parsed_like_api_batches(self, tmp_path):
+        files = write_corpus(tmp_path, 250, posts_per_file=60, heavy_hashtag_rate=0.2)
+        assert len(files) == 5
+        posts = HashtagPosts.from_json_files(tmp_path).posts
+        assert len(posts) == 250
+        assert any(post['text'] is None for post in posts.values())
+        assert any(len(post['hashtags'] or ()) == 30 for post in posts.values())
+        timestamps = [post['timestamp'] for post in posts.values()]
+        assert timestamps == sorted(timestamps, reverse=True)
+
+    def test_location_endpoint(self, tmp_path):
+        write_corpus(tmp_path, 10, endpoint='location')
+        assert len(LocationPosts.from_json_files(tmp_path).posts) == 10
+
+    def test_categories_match_hashtags(self, tmp_path):
+        write_corpus(tmp_path, 300)
+        write_categories(tmp_path / 'categories.csv')
+        posts = HashtagPosts.from_json_files(tmp_path)
+        posts.set_custom_categories(tmp_path / 'categories.csv')
+        assert posts.popular_categories()
+
+    def test_compare(self):
+        baseline = [{'stage': 'to_df', 'size': '10k', 'seconds': 1.0}]
+        assert compare([{'stage': 'to_df', 'size': '10k', 'seconds': 1.1}], baseline) == []
+        assert compare([{'stage': 'to_df', 'size': '10k', 'seconds': 2.0}], baseline)
+        assert compare([{'stage': 'to_df', 'size': '10k', 'seconds': 0.04}],
+                       [{'stage': 'to_df', 'size': '10k', 'seconds': 0.02}]) == []
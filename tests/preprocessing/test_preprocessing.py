@@ -1,3 +1,17 @@
+import gzip
+from datetime import datetime, timedelta
+import json
+from pathlib import Path
+import pickle
+import shutil
+from unittest.mock import patch
+import pandas as pd
+import pytest
+import random
+from instatools.preprocessing.index import HashtagIndex
+from instatools.preprocessing.sketches import SpaceSaving
+from instatools.preprocessing.store import PostsStore
+from instatools.preprocessing.timeindex import TimeIndex
 from instatools.preprocessing.preprocessing import (
     Posts,
     HashtagPosts,
@@ -42,6 +56,114 @@ class ParseFromMultipleJsonFilesTests:
         result = LocationPosts.from_json_files(path)
         assert result.posts == posts
 
+    def test_with_multiple_workers(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        result = HashtagPosts.from_json_files(path, workers=2)
+        assert result.posts == posts
+        assert list(result.posts) == list(HashtagPosts.from_json_files(path).posts)
+
+    def test_with_cache(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        for file in Path(path).glob('*.json'):
+            shutil.copy(file, tmp_path)
+        cache_path = tmp_path / 'cache.gz'
+        assert HashtagPosts.from_json_files(tmp_path, cache=cache_path).posts == posts
+        assert cache_path.exists()
+
+        (tmp_path / '1.json').unlink()
+        expected = HashtagPosts.from_json_files(tmp_path).posts
+        with patch.object(HashtagPosts, '_extract_posts_from_json') as parse:
+            result = HashtagPosts.from_json_files(tmp_path, cache=cache_path)
+        parse.assert_not_called()
+        assert result.posts == expected
+
+    def test_cache_reparses_modified_files(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        for file in Path(path).glob('*.json'):
+            shutil.copy(file, tmp_path)
+        HashtagPosts.from_json_files(tmp_path, cache=True)
+        shutil.copy(tmp_path / '1.json', tmp_path / '5.json')
+        with patch.object(HashtagPosts, '_extract_posts_from_json', return_value=[]) as parse:
+            HashtagPosts.from_json_files(tmp_path, cache=True)
+        parse.assert_called_once_with(tmp_path / '5.json')
+
+    def test_cache_ignores_pickle(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        for file in Path(path).glob('*.json'):
+            shutil.copy(file, tmp_path)
+        cache_path = tmp_path / 'cache.gz'
+        cache_path.write_bytes(pickle.dumps({'version': 2, 'json_field': HashtagPosts.JSON_FIELD,
+                                             'files': dict()}))
+        assert HashtagPosts.from_json_files(tmp_path, cache=cache_path).posts == posts
+        with gzip.open(cache_path, 'rt', encoding='utf8') as file:
+            assert len(json.load(file)['files']) == len(list(tmp_path.glob('*.json')))
+
+    def test_gzip_files(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        for file in Path(path).glob('*.json'):
+            target_path = tmp_path / (file.name + '.gz')
+            with open(file, 'rb') as source, gzip.open(target_path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+        assert HashtagPosts.from_json_files(tmp_path).posts == posts
+
+    def test_files_in_natural_order(self, tmp_path):
+        for name in ['10.json', '2.json', '1.json']:
+            (tmp_path / name).touch()
+        result = Posts._find_json_files(tmp_path)
+        assert [file.name for file in result] == ['1.json', '2.json', '10.json']
+
+
+class StreamingTests:
+
+    def test_iter_json_files(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        result = HashtagPosts.iter_json_files(path)
+        assert not isinstance(result, dict)
+        assert dict(result) == posts
+
+    def test_stream_remove_posts(self, multiple_location_json):
+        path, posts = multiple_location_json
+        junk_hashtags = ['#park', '#sunday']
+        result = LocationPosts.stream_remove_posts(
+            LocationPosts.iter_json_files(path), junk_hashtags)
+        assert dict(result) == LocationPosts(posts).remove_posts(junk_hashtags).posts
+
+    def test_stream_popular_hashtags(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        for pct in [True, False]:
+            result = HashtagPosts.stream_popular_hashtags(
+                HashtagPosts.iter_json_files(path), n=5, pct=pct)
+            assert result == HashtagPosts(posts).popular_hashtags(n=5, pct=pct)
+
+    def test_stream_popular_categories(self):
+        posts = {'1': {'categories': ['a', 'b']}, '2': {'categories': ['a']},
+                 '3': {'categories': None}, '4': {'categories': ['c']}}
+        result = Posts.stream_popular_categories(iter(posts.items()))
+        assert result == Posts(posts).popular_categories()
+
+
+class UpdateTests:
+
+    def test_update(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        hp = HashtagPosts({}).to_df()
+        hp.index
+        for file in HashtagPosts._find_json_files(path):
+            hp.update(HashtagPosts._extract_posts_from_json(file))
+        assert hp.posts == posts
+        assert hp.index.ids == HashtagPosts(posts).index.ids
+        assert sorted(hp.df.index) == sorted(posts)
+
+    def test_update_compact_df(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        files = HashtagPosts._find_json_files(path)
+        hp = HashtagPosts(dict(HashtagPosts._extract_posts_from_json(files[0])))
+        hp.to_df(compact=True)
+        for file in files[1:]:
+            hp.update(HashtagPosts._extract_posts_from_json(file))
+        assert len(hp.df) == len(posts)
+        pd.testing.assert_frame_equal(hp.df, HashtagPosts(dict(hp.posts)).to_df(compact=True).df)
+
 
 class RemovePostsTests:
 
@@ -49,6 +171,17 @@ class RemovePostsTests:
         hashtags = ['#foo', '#bar']
         assert Posts._detect_junk_hashtags(hashtags, ['#foo']) is True
         assert Posts._detect_junk_hashtags(hashtags, ['#baz']) is False
+        assert Posts._detect_junk_hashtags(hashtags, {'#bar', '#baz'}) is True
+        assert Posts._detect_junk_hashtags(None, {'#foo'}) is False
+
+    def test_junk_set_built_once(self):
+        posts = {str(id): {'hashtags': [f'#{id}']} for id in range(100)}
+        junk_hashtags = [f'#{id}' for id in range(0, 100, 2)]
+        with patch.object(Posts, '_detect_junk_hashtags',
+                          wraps=Posts._detect_junk_hashtags) as detect:
+            result = dict(Posts.stream_remove_posts(posts.items(), junk_hashtags))
+        assert sorted(result, key=int) == [str(id) for id in range(1, 100, 2)]
+        assert all(isinstance(call.args[1], set) for call in detect.call_args_list)
 
     def test_for_hashtag_endpoint(self, multiple_hashtag_json):
         path, posts = multiple_hashtag_json
@@ -65,3 +198,416 @@ class RemovePostsTests:
         lp_filtered = lp.remove_posts(junk_hashtags)
         assert any([any([hashtag in v['hashtags'] for hashtag in junk_hashtags])
                     for k, v in lp_filtered.posts.items() if v['hashtags']]) is False
+
+
+class HashtagIndexTests:
+
+    posts = {'1': {'hashtags': ['#a', '#b']}, '2': {'hashtags': ['#b', '#c', '#b']},
+             '3': {'hashtags': None}, '4': {'hashtags': ['#c']}}
+
+    def test_any_and_all(self):
+        index = HashtagIndex(self.posts)
+        assert index.any(['#a', '#c']) == {'1', '2', '4'}
+        assert index.all(['#b', '#c']) == {'2'}
+        assert index.all(['#a', '#d']) == set()
+
+    def test_counts_occurrences(self):
+        index = HashtagIndex(self.posts)
+        assert index.counts.most_common(1) == [('#b', 3)]
+
+    def test_remove(self):
+        index = HashtagIndex(self.posts)
+        index.remove('2', self.posts['2']['hashtags'])
+        assert index.ids == HashtagIndex({k: v for k, v in self.posts.items() if k != '2'}).ids
+        assert '#b' in index.counts and index.counts['#b'] == 1
+
+    def test_index_updated_after_remove_posts(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        hp = HashtagPosts(posts)
+        hp.index
+        filtered = hp.remove_posts(['#katowice'])
+        assert filtered.index.ids == HashtagIndex(filtered.posts).ids
+        assert +filtered.index.counts == +HashtagIndex(filtered.posts).counts
+
+    def test_select_posts(self):
+        posts = Posts(self.posts)
+        assert set(posts.select_posts(any_hashtags=['#a', '#c']).posts) == {'1', '2', '4'}
+        assert set(posts.select_posts(all_hashtags=['#b', '#c']).posts) == {'2'}
+        assert set(posts.select_posts(['#a', '#c'], ['#b']).posts) == {'1', '2'}
+
+
+class CustomCategoriesTests:
+
+    categories = {'Workshop': ['#workshop', '#arduino'], 'Data': ['#data', '#katowice']}
+
+    def write_categories(self, tmp_path):
+        file_path = tmp_path / 'categories.csv'
+        file_path.write_text(
+            'category,hashtags\nWorkshop,"#workshop, #arduino"\nData,"#data, #katowice"\n')
+        return file_path
+
+    def test_hashtags_to_categories(self):
+        assert Posts._hashtags_to_categories(
+            self.categories, ['#katowice', '#arduino']) == ['Workshop', 'Data']
+        assert Posts._hashtags_to_categories(self.categories, ['#foo']) is None
+        assert Posts._hashtags_to_categories(self.categories, None) is None
+
+    def test_set_custom_categories(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        hp = HashtagPosts(posts)
+        hp.to_df()
+        hp.set_custom_categories(self.write_categories(tmp_path))
+        for post in hp.posts.values():
+            expected = Posts._hashtags_to_categories(self.categories, post['hashtags'])
+            assert post['categories'] == expected
+        assert hp.df['categories'].tolist() == [
+            post['categories'] for post in hp.posts.values()]
+
+    def test_set_custom_categories_compact_df(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        hp = HashtagPosts(posts).to_df(compact=True)
+        hp.set_custom_categories(self.write_categories(tmp_path))
+        expected = [post['categories'] for post in hp.posts.values()]
+        assert any(expected)
+        assert hp.df['categories'].tolist() == expected
+
+    def test_stream_custom_categories(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        file_path = self.write_categories(tmp_path)
+        hp = HashtagPosts(posts)
+        hp.set_custom_categories(file_path)
+        result = dict(HashtagPosts.stream_custom_categories(
+            HashtagPosts.iter_json_files(path), file_path))
+        assert {id: post['categories'] for id, post in result.items()} == {
+            id: post['categories'] for id, post in hp.posts.items()}
+
+
+class ToDfTests:
+
+    def test_same_as_from_dict(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        hp = HashtagPosts(posts).to_df()
+        assert hp.df.equals(pd.DataFrame.from_dict(posts, orient='index'))
+
+    def test_compact(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        df = HashtagPosts(posts).to_df(compact=True).df
+        assert pd.api.types.is_integer_dtype(df.index)
+        assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
+        assert isinstance(df['user_name'].dtype, pd.CategoricalDtype)
+        assert df['likes'].dtype == 'int64'
+
+    def test_long_and_sparse(self):
+        posts = Posts({'1': {'hashtags': ['#a', '#b']}, '2': {'hashtags': None},
+                       '3': {'hashtags': ['#b', '#b']}})
+        long_df = posts.to_long_df()
+        assert long_df['id'].tolist() == ['1', '1', '3', '3']
+        sparse_df = posts.to_sparse_df()
+        assert sparse_df.index.tolist() == ['1', '2', '3']
+        assert sparse_df.sparse.to_dense().to_dict('list') == {'#a': [1, 0, 0], '#b': [1, 0, 1]}
+
+
+class PostsStoreTests:
+
+    def test_round_trip(self, multiple_hashtag_json, tmp_path):
+        path, posts = multiple_hashtag_json
+        HashtagPosts(posts).to_sqlite(tmp_path / 'posts.db')
+        assert HashtagPosts.from_sqlite(tmp_path / 'posts.db').posts == posts
+
+    def test_upsert(self, tmp_path):
+        with PostsStore(tmp_path / 'posts.db') as store:
+            store.upsert([('1', {'likes': 1, 'hashtags': ['#a']})])
+            store.upsert([('1', {'likes': 2, 'hashtags': ['#b']})], replace=False)
+            assert dict(store.iter_posts())['1']['likes'] == 1
+            store.upsert([('1', {'likes': 3, 'hashtags': ['#b']})])
+            assert dict(store.iter_posts())['1']['likes'] == 3
+            assert store.popular_hashtags() == [('#b', 1)]
+
+    def test_analysis(self, multiple_location_json, tmp_path):
+        path, posts = multiple_location_json
+        lp = LocationPosts(posts)
+        categories_path = tmp_path / 'categories.csv'
+        categories_path.write_text('category,hashtags\nPark,"#park, #sunday"\nCity,#katowice\n')
+        with PostsStore(tmp_path / 'posts.db') as store:
+            store.upsert(lp.posts.items())
+            for pct in [True, False]:
+                assert store.popular_hashtags(5, pct) == lp.popular_hashtags(5, pct)
+            store.set_custom_categories(categories_path)
+            lp.set_custom_categories(categories_path)
+            assert sorted(store.popular_categories()) == sorted(lp.popular_categories())
+            removed = store.remove_posts(['#park', '#sunday'])
+            assert removed == len(lp.posts) - len(lp.remove_posts(['#park', '#sunday']).posts)
+            assert len(store) == len(lp.posts) - removed
+
+
+class ParquetTests:
+
+    def test_round_trip(self, multiple_hashtag_json, tmp_path):
+        pytest.importorskip('pyarrow')
+        path, posts = multiple_hashtag_json
+        for partition_by in ['date', 'month', None]:
+            HashtagPosts(posts).to_parquet(tmp_path / str(partition_by), partition_by)
+            assert HashtagPosts.from_parquet(tmp_path / str(partition_by)).posts == posts
+
+    def test_columns_and_filters(self, multiple_hashtag_json, tmp_path):
+        pytest.importorskip('pyarrow')
+        path, posts = multiple_hashtag_json
+        HashtagPosts(posts).to_parquet(tmp_path)
+        result = HashtagPosts.from_parquet(
+            tmp_path, columns=['hashtags'], filters=[('month', '=', '2020-11')])
+        expected = {id: {'hashtags': post['hashtags']} for id, post in posts.items()
+                    if post['timestamp'].startswith('2020-11')}
+        assert result.posts == expected
+        result = HashtagPosts.from_parquet(
+            tmp_path, filters=[('timestamp', '>=', datetime(2020, 1, 1))])
+        assert len(result.posts) == len([
+            post for post in posts.values() if post['timestamp'] >= '2020'])
+
+
+class MergeTests:
+
+    def split(self, posts, parts=3):
+        ids = list(posts)
+        return [HashtagPosts({id: posts[id] for id in ids[i::parts]}) for i in range(parts)]
+
+    def test_add_keeps_class(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        first, second, third = self.split(posts)
+        result = first + second + third
+        assert isinstance(result, HashtagPosts)
+        assert result.posts == posts
+        assert isinstance(first + LocationPosts({}), Posts)
+
+    def test_concat_duplicates(self):
+        first = Posts({'1': {'hashtags': ['#a']}, '2': {'hashtags': ['#b']}})
+        second = Posts({'2': {'hashtags': ['#c']}, '3': {'hashtags': None}})
+        first.index
+        last = Posts.concat([first, second])
+        assert last.posts == {**first.posts, **second.posts}
+        assert last.index.ids == HashtagIndex(last.posts).ids
+        kept = Posts.concat([first, second], keep='first')
+        assert kept.posts['2'] == {'hashtags': ['#b']}
+        assert kept.index.ids == HashtagIndex(kept.posts).ids
+
+    def test_concat_carries_df(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        parts = [part.to_df() for part in self.split(posts)]
+        result = HashtagPosts.concat(parts)
+        assert result.df.equals(HashtagPosts(result.posts).to_df().df)
+
+    def test_iadd(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        first, second, third = self.split(posts)
+        first.to_df().index
+        first += second
+        first += third
+        assert first.posts == posts
+        assert first.index.ids == HashtagIndex(posts).ids
+        assert sorted(first.df.index) == sorted(posts)
+
+    def test_concat_compact_df(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        parts = [part.to_df(compact=True) for part in self.split(posts)]
+        expected = HashtagPosts(posts).to_df(compact=True).df
+        result = HashtagPosts.concat(parts)
+        pd.testing.assert_frame_equal(result.df.sort_index(), expected.sort_index())
+        whole = HashtagPosts(posts).to_df(compact=True)
+        pd.testing.assert_frame_equal(HashtagPosts.concat([whole, whole]).df, expected)
+        mixed = HashtagPosts.concat([parts[0], self.split(posts)[1].to_df()])
+        assert len(mixed.df) == len(mixed.posts) and not mixed.df.isna().all(axis=1).any()
+
+    def test_iadd_compact_df(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        first, second, third = self.split(posts)
+        first.to_df(compact=True)
+        first += second
+        first += third.to_df()
+        first += HashtagPosts(posts)
+        assert len(first.df) == len(posts)
+        pd.testing.assert_frame_equal(first.df.sort_index(),
+                                      HashtagPosts(posts).to_df(compact=True).df.sort_index())
+
+    def test_iadd_compact_df_to_default_df(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        first, second, third = self.split(posts)
+        first.to_df()
+        first += second.to_df(compact=True)
+        first += third
+        assert len(first.df) == len(posts)
+        assert pd.api.types.is_integer_dtype(first.df.index)
+        pd.testing.assert_frame_equal(first.df.sort_index(),
+                                      HashtagPosts(posts).to_df(compact=True).df.sort_index())
+
+
+class QueryTests:
+
+    def test_chained_conditions(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        collection = HashtagPosts(posts)
+        tags = collection.popular_hashtags(2)
+        hashtags = [tag for tag, _ in tags]
+        query = collection.where(hashtags_any=hashtags).where(min_likes=1, since='2000')
+        expected = {id for id, post in posts.items()
+                    if set(post['hashtags'] or ()) & set(hashtags)
+                    and post['likes'] >= 1 and post['timestamp'] >= '2000'}
+        assert set(query.ids()) == expected
+        assert len(query) == len(expected)
+
+    def test_narrowing(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        collection = HashtagPosts(posts)
+        timestamps = sorted(post['timestamp'] for post in posts.values())
+        since = datetime.fromisoformat(timestamps[len(timestamps) // 2])
+        query = collection.where(since='2000', max_likes=10 ** 9).where(since=since)
+        assert query.conditions['since'] == TimeIndex.to_epoch(since)
+        assert set(query.ids()) == {id for id, post in posts.items()
+                                    if post['timestamp'] >= since.isoformat()}
+        times = [posts[id]['timestamp'] for id in query.ids()]
+        assert times == sorted(times)
+
+    def test_views_share_records(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        collection = HashtagPosts(posts)
+        user_id = next(iter(posts.values()))['user_id']
+        query = collection.where(user_id=user_id, predicate=lambda post: post['comments'] >= 0)
+        for id, post in query:
+            assert post is posts[id]
+        result = query.collect()
+        assert isinstance(result, HashtagPosts)
+        assert all(result.posts[id] is posts[id] for id in result.posts)
+        assert query.popular_hashtags(None) == result.popular_hashtags(None)
+
+    def test_hashtags_all(self):
+        collection = Posts({'1': {'hashtags': ['#a', '#b']}, '2': {'hashtags': ['#a']},
+                            '3': {'hashtags': None}})
+        assert collection.where(hashtags_all=['#a', '#b']).ids() == ['1']
+        assert sorted(collection.where(hashtags_any=['#a']).ids()) == ['1', '2']
+        assert collection.where(hashtags_any=['#c']).ids() == []
+
+
+class TimeIndexTests:
+
+    def test_range(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        index = TimeIndex(posts)
+        timestamps = sorted(post['timestamp'] for post in posts.values())
+        since, until = timestamps[1], timestamps[-2]
+        expected = {id for id, post in posts.items() if since <= post['timestamp'] < until}
+        assert set(index.range(since, until)) == expected
+        assert index.range(until, since) == []
+
+    def test_add_remove(self):
+        index = TimeIndex({'1': {'timestamp': '2020-01-02T00:00:00'}})
+        index.add('2', '2020-01-01T00:00:00')
+        index.add('3', '2020-01-02T00:00:00')
+        assert index.range() == ['2', '1', '3']
+        index.remove('1', '2020-01-02T00:00:00')
+        assert index.range(since=datetime(2020, 1, 2)) == ['3']
+
+    def test_updated_with_posts(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        ids = list(posts)
+        collection = Posts({id: posts[id] for id in ids[:5]})
+        collection.time_index
+        collection.update((id, posts[id]) for id in ids[5:])
+        assert collection.time_index.ids == TimeIndex(posts).ids
+
+    def test_periods(self):
+        index = TimeIndex({'1': {'timestamp': '2020-01-31T23:00:00'},
+                           '2': {'timestamp': '2020-02-01T01:00:00'},
+                           '3': {'timestamp': '2020-02-03T10:00:00'}})
+        assert list(index.periods('month')) == [
+            (datetime(2020, 1, 1), ['1']), (datetime(2020, 2, 1), ['2', '3'])]
+        assert list(index.periods('week')) == [
+            (datetime(2020, 1, 27), ['1', '2']), (datetime(2020, 2, 3), ['3'])]
+        with pytest.raises(ValueError):
+            list(index.periods('year'))
+
+
+class PopularOverTimeTests:
+
+    def test_periods_match_recount(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        collection = HashtagPosts(posts)
+        for start, result in collection.popular_hashtags_over_time('day', n=None):
+            end = start + timedelta(days=1)
+            expected = collection.where(since=start, until=end).collect()
+            assert sorted(result) == sorted(expected.popular_hashtags(None))
+
+    def test_rolling_matches_recount(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        collection = HashtagPosts(posts)
+        window, step = timedelta(hours=6), timedelta(hours=1)
+        results = collection.popular_hashtags_over_time(window, n=None, pct=True, step=step)
+        assert results
+        for start, result in results:
+            expected = collection.where(since=start, until=start + window).collect()
+            assert sorted(result) == sorted(expected.popular_hashtags(None, pct=True))
+
+    def test_categories(self):
+        collection = Posts({'1': {'timestamp': '2020-01-01T10:00:00', 'categories': ['a']},
+                            '2': {'timestamp': '2020-01-01T12:00:00', 'categories': ['a', 'b']},
+                            '3': {'timestamp': '2020-01-02T10:00:00', 'categories': None}})
+        assert collection.popular_categories_over_time('day', pct=False) == [
+            (datetime(2020, 1, 1), [('a', 2), ('b', 1)]), (datetime(2020, 1, 2), [])]
+
+
+class SketchTests:
+
+    @staticmethod
+    def posts(number, seed=0):
+        rng = random.Random(seed)
+        weights = [1 / rank for rank in range(1, 201)]
+        return {str(id): {'hashtags': [f'#{h}' for h in set(rng.choices(range(200), weights, k=3))]}
+                for id in range(number)}
+
+    def test_exact_within_capacity(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        collection = HashtagPosts(posts)
+        for pct in [True, False]:
+            assert sorted(collection.popular_hashtags(n=None, pct=pct, capacity=10000)) == \
+                sorted(collection.popular_hashtags(n=None, pct=pct))
+        categories = Posts({'1': {'categories': ['a', 'b']}, '2': {'categories': ['a']},
+                            '3': {'categories': None}})
+        assert categories.popular_categories(capacity=10) == categories.popular_categories()
+
+    def test_bounds(self):
+        posts = self.posts(2000)
+        counts = Posts(posts).index.counts
+        sketch = Posts.sketch(posts.items(), capacity=50)
+        assert len(sketch) == 50 and sketch.records == 2000
+        for value, lowest, highest in sketch.bounds():
+            assert lowest <= counts[value] <= highest
+            assert highest - lowest <= sketch.total / 50
+        top = [value for value, _ in counts.most_common(5)]
+        assert sketch.guaranteed(5)
+        assert [value for value, _ in sketch.most_common(5)] == top
+
+    def test_merge(self):
+        posts = self.posts(3000)
+        counts = Posts(posts).index.counts
+        items = list(posts.items())
+        sketches = [Posts.sketch(items[start:start + 1000], capacity=50)
+                    for start in range(0, 3000, 1000)]
+        merged = SpaceSaving.merge_all(sketches)
+        assert merged.records == 3000
+        assert merged.total == sum(counts.values())
+        for value, lowest, highest in merged.bounds():
+            assert lowest <= counts[value] <= highest
+        assert [value for value, _ in merged.most_common(3)] == \
+            [value for value, _ in counts.most_common(3)]
+
+    def test_json_round_trip(self):
+        sketch = Posts.sketch(self.posts(500).items(), capacity=20)
+        restored = SpaceSaving.from_json(sketch.to_json())
+        assert restored.bounds() == sketch.bounds()
+        assert (restored.total, restored.records) == (sketch.total, sketch.records)
+        restored.update(['#new'])
+        assert restored.records == sketch.records + 1
+
+    def test_sketch_json_files(self, multiple_hashtag_json):
+        path, posts = multiple_hashtag_json
+        counts = HashtagPosts(posts).index.counts
+        for workers in [None, 2]:
+            sketch = HashtagPosts.sketch_json_files(path, capacity=10000, workers=workers)
+            assert dict(sketch.most_common()) == dict(counts)
@@ -0,0 +1,46 @@
+from pathlib import Path
+from benchmarks.fakeapi import FakeInstagramAPI
+from benchmarks.synthetic import make_jpeg
+from instatools.scraping import DownloadManifest, HashtagScraper, RateLimiter
+
+
+class DownloadManifestTests:
+
+    def test_record_and_completed(self, tmp_path):
+        with DownloadManifest(tmp_path / 'manifest.sqlite') as manifest:
+            manifest.record('1', 'https://cdn/1.jpg', 'ok', 100)
+            manifest.record(2, 'https://cdn/2.jpg', 'failed')
+            manifest.record('3', 'https://cdn/3.jpg', 'failed')
+            manifest.record('3', 'https://cdn/3.jpg', 'ok', 300)
+            assert manifest.completed() == {'1', '3'}
+            assert len(manifest) == 3
+        with DownloadManifest(tmp_path / 'manifest.sqlite') as manifest:
+            assert manifest.completed() == {'1', '3'}
+
+    def test_import_files(self, tmp_path):
+        for id in ('1', '2'):
+            Path(tmp_path, id + '.jpg').write_bytes(make_jpeg(100))
+        with DownloadManifest(tmp_path / 'manifest.sqlite') as manifest:
+            manifest.record('2', 'https://cdn/2.jpg', 'failed')
+            manifest.import_files(sorted(tmp_path.glob('*.jpg')))
+            assert manifest.completed() == {'1'}
+            assert len(manifest) == 2
+
+    def test_first_run_imports_only_jpeg_files(self, tmp_path):
+        with FakeInstagramAPI(pages=1, posts_per_page=3, image_size=1000) as api:
+            scraper = HashtagScraper('session', tmp_path).set_api_session(
+                rate_limiter=RateLimiter(rate=None))
+            posts = dict(scraper.iter_posts(api.hashtag_url('test')))
+            first, second, third = posts
+            images_path = Path(tmp_path, 'images')
+            images_path.mkdir()
+            Path(images_path, first + '.jpg').write_bytes(make_jpeg(500))
+            Path(images_path, second + '.jpg').write_bytes(b'<html>Not Found</html>')
+            report = scraper.extract_images(posts)
+            assert report == {'succeeded': 2, 'failed': 0, 'skipped': 1}
+            assert api.stats['images'] == 2
+            report = scraper.extract_images(posts)
+        assert report == {'succeeded': 0, 'failed': 0, 'skipped': 3}
+        assert Path(images_path, second + '.jpg').stat().st_size == 1000
+        with DownloadManifest(Path(images_path, 'manifest.sqlite')) as manifest:
+            assert manifest.completed() == {first, second, third}
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from instatools.scraping.ratelimit import RateLimiter
+
+
+class RateLimiterTests:
+
+    def test_paces_requests(self):
+        limiter = RateLimiter(rate=20)
+        waited = sum(limiter.acquire() for _ in range(5))
+        assert waited >= 0.15
+
+    def test_unlimited_rate(self):
+        limiter = RateLimiter(rate=None)
+        assert sum(limiter.acquire() for _ in range(100)) == 0
+
+    def test_failure_slows_down_and_pauses(self):
+        limiter = RateLimiter(rate=1, backoff=0.05)
+        pause = limiter.failure()
+        assert limiter.rate == 0.5
+        assert 0.025 <= pause <= 0.05
+
+    def test_backoff_grows_exponentially(self):
+        limiter = RateLimiter(rate=None, backoff=1, max_backoff=3)
+        pauses = [limiter.failure() for _ in range(4)]
+        assert pauses[0] <= 1 <= pauses[1] and 1.5 <= pauses[3] <= 3
+
+    def test_honours_retry_after(self):
+        limiter = RateLimiter(rate=None)
+        assert limiter.failure('7') == 7
+        date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30))
+        assert 25 < limiter.failure(date) <= 30
+
+    def test_speeds_up_after_successes(self):
+        limiter = RateLimiter(rate=1, max_rate=1.2, speedup_after=2)
+        limiter.failure(0)
+        for _ in range(10):
+            limiter.success()
+        assert limiter.rate == 1.2
+
+    def test_default_ceiling_above_initial_rate(self):
+        limiter = RateLimiter(rate=0.5, speedup_after=1)
+        for _ in range(20):
+            limiter.success()
+        assert limiter.rate == limiter.max_rate == 2
+        assert RateLimiter(rate=None).max_rate is None
@@ -0,0 +1,279 @@
+import json
+from pathlib import Path
+import random
+import threading
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from benchmarks.fakeapi import FakeInstagramAPI
+from benchmarks.synthetic import make_media, make_page
+from instatools.preprocessing.preprocessing import HashtagPosts
+from instatools.scraping import (
+    AsyncScraper, DownloadManifest, HashtagScraper, LocationScraper, RateLimiter, RequestMetric,
+    ScraperMetrics
+)
+
+
+def session(scraper, throttle_retries=3):
+    return scraper.set_api_session(throttle_retries=throttle_retries, rate_limiter=RateLimiter(
+        rate=None, backoff=0.001, max_backoff=0.01))
+
+
+class ExtractPostsTests:
+
+    def test_follows_pagination(self, tmp_path):
+        with FakeInstagramAPI(pages=3, posts_per_page=6) as api:
+            scraper = session(HashtagScraper('session', tmp_path))
+            posts = HashtagPosts({})
+            scraper.extract_posts(api.hashtag_url('test'), sink=posts.update)
+        assert api.stats['pages'] == 3
+        assert len(posts.posts) == 18
+        assert HashtagPosts.from_json_files(Path(tmp_path, 'posts', 'hashtag')).posts == posts.posts
+
+    def test_location(self, tmp_path):
+        with FakeInstagramAPI(pages=2, posts_per_page=6) as api:
+            scraper = session(LocationScraper('session', tmp_path))
+            posts = list(scraper.iter_posts(api.location_url(123), archive=None))
+        assert len(posts) == 12
+        ids = [int(id) for id, _ in posts]
+        assert ids == sorted(ids, reverse=True)
+        assert not list(Path(tmp_path, 'posts', 'location').glob('*.json'))
+
+    def test_retries_failures(self, tmp_path):
+        with FakeInstagramAPI(pages=5, posts_per_page=3, error_rate=0.2,
+                              throttle_rate=0.2, seed=1) as api:
+            scraper = session(HashtagScraper('session', tmp_path), throttle_retries=10)
+            scraper.extract_posts(api.hashtag_url('test'))
+        assert api.stats['errors'] + api.stats['throttled'] > 0
+        assert api.stats['pages'] == 5
+        assert len(list(Path(tmp_path, 'posts', 'hashtag').glob('*.json'))) == 5
+
+    def test_async_scraper(self, tmp_path):
+        with FakeInstagramAPI(pages=2, posts_per_page=3) as api:
+            scraper = session(AsyncScraper('session', tmp_path, max_concurrency=4, delay=0))
+            posts = HashtagPosts({})
+            scraper.extract_posts([api.hashtag_url(f'test{i}') for i in range(3)],
+                                  sink=posts.update)
+        assert api.stats['pages'] == 6
+        assert len(posts.posts) == 18
+
+    def test_async_scraper_rejects_single_url(self, tmp_path):
+        scraper = session(AsyncScraper('session', tmp_path))
+        url = 'https://www.instagram.com/explore/tags/test/'
+        with pytest.raises(TypeError):
+            scraper.extract_posts(url)
+        with pytest.raises(NotImplementedError):
+            scraper.iter_posts([url])
+
+
+class StubFeed:
+    """Pages of a hashtag with the given post ids, failing selected requests."""
+
+    def __init__(self, ids, page_size, fail=()):
+        self.ids = ids
+        self.page_size = page_size
+        self.fail = set(fail)
+        self.requests = 0
+
+    def __call__(self, url):
+        self.requests += 1
+        if self.requests in self.fail:
+            raise ConnectionError('stubbed failure')
+        start = int(parse_qs(urlsplit(url).query).get('max_id', ['0'])[0])
+        stop = start + self.page_size
+        medias = [make_media(pk, 1600000000 + pk, f'https://cdn/{pk}.jpg', random.Random(pk))
+                  for pk in self.ids[start:stop]]
+        return make_page('hashtag', medias, str(stop) if stop < len(self.ids) else None)
+
+
+class CheckpointTests:
+
+    url = 'https://www.instagram.com/explore/tags/test/'
+
+    @staticmethod
+    def extract(tmp_path, feed, **kwargs):
+        scraper = HashtagScraper('session', tmp_path)
+        scraper._request_page = feed
+        posts = HashtagPosts({})
+        scraper.extract_posts(CheckpointTests.url, sink=posts.update, **kwargs)
+        return {int(id) for id in posts.posts}
+
+    @staticmethod
+    def checkpoint(tmp_path):
+        with open(Path(tmp_path, 'posts', 'hashtag', 'checkpoint'), encoding='utf8') as file:
+            return json.load(file)
+
+    def test_resumes_interrupted_crawl(self, tmp_path):
+        ids = list(range(120, 100, -1))
+        first = self.extract(tmp_path, StubFeed(ids, 5, fail={3}))
+        assert first == set(range(111, 121))
+        pages = self.checkpoint(tmp_path)['targets'][self.url]['pages']
+        assert [page['status'] for page in pages.values()] == ['ok', 'ok', 'failed']
+        feed = StubFeed(ids, 5)
+        second = self.extract(tmp_path, feed)
+        assert feed.requests == 2 and second == set(range(101, 111))
+        feed = StubFeed(ids, 5)
+        assert not self.extract(tmp_path, feed) and feed.requests == 0
+        files = Path(tmp_path, 'posts', 'hashtag').glob('*.json')
+        assert HashtagPosts.from_json_files(Path(tmp_path, 'posts', 'hashtag')).posts.keys() == \
+            {str(id) for id in ids}
+        assert sorted(int(path.stem) for path in files) == [1, 2, 3, 4]
+
+    def test_does_not_overwrite_files(self, tmp_path):
+        posts_path = Path(tmp_path, 'posts', 'hashtag')
+        posts_path.mkdir(parents=True)
+        for page in (1, 2):
+            Path(posts_path, f'{page}.json').write_text('existing', encoding='utf8')
+        self.extract(tmp_path, StubFeed(list(range(10, 0, -1)), 5))
+        assert Path(posts_path, '1.json').read_text(encoding='utf8') == 'existing'
+        assert Path(posts_path, '2.json').read_text(encoding='utf8') == 'existing'
+        assert sorted(int(path.stem) for path in posts_path.glob('*.json')) == [1, 2, 3, 4]
+
+    def test_interrupted_incremental_run(self, tmp_path):
+        self.extract(tmp_path, StubFeed(list(range(100, 90, -1)), 5))
+        assert self.checkpoint(tmp_path)['targets'][self.url]['latest_id'] == 100
+        ids = list(range(110, 90, -1))
+        fetched = self.extract(tmp_path, StubFeed(ids, 5, fail={2}), incremental=True)
+        assert fetched == set(range(106, 111))
+        assert self.checkpoint(tmp_path)['targets'][self.url]['latest_id'] == 100
+        feed = StubFeed(ids, 5)
+        fetched = self.extract(tmp_path, feed, incremental=True)
+        assert feed.requests == 3 and fetched >= set(range(101, 111))
+        state = self.checkpoint(tmp_path)['targets'][self.url]
+        assert state['latest_id'] == 110 and 'pending_id' not in state
+        feed = StubFeed(ids, 5)
+        assert self.extract(tmp_path, feed, incremental=True) == set(range(106, 111))
+        assert feed.requests == 1
+
+
+class ExtractImagesTests:
+
+    def test_downloads_and_skips(self, tmp_path):
+        with FakeInstagramAPI(pages=1, posts_per_page=6, image_size=1000) as api:
+            scraper = session(HashtagScraper('session', tmp_path))
+            posts = HashtagPosts(dict(scraper.iter_posts(api.hashtag_url('test'))))
+            report = scraper.extract_images(posts.posts, workers=3)
+            assert report == {'succeeded': 6, 'failed': 0, 'skipped': 0}
+            report = scraper.extract_images(posts.posts, workers=3)
+        assert report == {'succeeded': 0, 'failed': 0, 'skipped': 6}
+        assert api.stats['images'] == 6
+        images = list(Path(tmp_path, 'images').glob('*.jpg'))
+        assert sorted(image.stem for image in images) == sorted(posts.posts)
+        assert all(image.stat().st_size == 1000 for image in images)
+
+    def test_resumes_partial_image(self, tmp_path):
+        with FakeInstagramAPI(pages=1, posts_per_page=1, image_size=100 * 1024) as api:
+            scraper = session(HashtagScraper('session', tmp_path))
+            id, post = next(scraper.iter_posts(api.hashtag_url('test')))
+            image = api._image
+            part_path = Path(tmp_path, 'images', id + '.jpg.part')
+            part_path.parent.mkdir(parents=True)
+            part_path.write_bytes(image[:70 * 1024])
+            assert scraper._request_image(post['display_url'], id) == len(image)
+        assert Path(tmp_path, 'images', id + '.jpg').read_bytes() == image
+
+    def test_part_file_promoted_after_size_check(self, tmp_path):
+        with FakeInstagramAPI(pages=1, posts_per_page=1, image_size=100 * 1024) as api:
+            scraper = session(HashtagScraper('session', tmp_path))
+            id, post = next(scraper.iter_posts(api.hashtag_url('test')))
+            image = api._image
+            part_path = Path(tmp_path, 'images', id + '.jpg.part')
+            part_path.parent.mkdir(parents=True)
+            for content in [image[:1024] + b'\xff\xd9', image, image + b'\x00\x00']:
+                part_path.write_bytes(content)
+                assert scraper._request_image(post['display_url'], id) == len(image)
+                assert Path(tmp_path, 'images', id + '.jpg').read_bytes() == image
+                assert not part_path.exists()
+        assert api.stats['images'] == 4
+
+    def test_is_jpeg(self, tmp_path):
+        image = FakeInstagramAPI(image_size=1000)._image
+        file_path = Path(tmp_path, '1.jpg')
+        file_path.write_bytes(image)
+        assert HashtagScraper._is_jpeg(file_path)
+        file_path.write_bytes(image[:500] + b'\xff\xd9' + b'\x00' * 10)
+        assert not HashtagScraper._is_jpeg(file_path)
+
+    def test_permanent_failure_not_retried(self, tmp_path):
+        with FakeInstagramAPI(pages=1, posts_per_page=1) as api:
+            scraper = session(HashtagScraper('session', tmp_path))
+            posts = {'1': {'display_url': f'{api.url}/missing.jpg'}}
+            report = scraper.extract_images(posts, retries=3)
+        assert report == {'succeeded': 0, 'failed': 1, 'skipped': 0}
+        assert api.stats['requests'] == 1
+        with DownloadManifest(Path(tmp_path, 'images', 'manifest.sqlite')) as manifest:
+            assert len(manifest) == 1 and not manifest.completed()
+
+
+class ConnectionPoolTests:
+
+    def test_adapters(self, tmp_path):
+        scraper = HashtagScraper('session', tmp_path).set_api_session(
+            max_retries=4, pool_maxsize=2, pool_block=True)
+        for url in ['https://www.instagram.com/explore/tags/test/',
+                    'https://scontent-waw1-1.cdninstagram.com/v/1.jpg', 'http://127.0.0.1/1.jpg']:
+            adapter = scraper._session.get_adapter(url)
+            assert adapter.max_retries.total == 4
+            assert not adapter.max_retries.respect_retry_after_header
+            assert adapter._pool_maxsize == 2 and adapter._pool_block
+
+    def test_pool_grows_with_workers(self, tmp_path):
+        with FakeInstagramAPI(pages=1, posts_per_page=6, image_size=1000) as api:
+            scraper = HashtagScraper('session', tmp_path).set_api_session(
+                pool_maxsize=2, rate_limiter=RateLimiter(rate=None))
+            posts = dict(scraper.iter_posts(api.hashtag_url('test')))
+            scraper.extract_images(posts, workers=6)
+            assert scraper._session.get_adapter(api.url)._pool_maxsize == 6
+            scraper.extract_images(posts, workers=3)
+            assert scraper._session.get_adapter(api.url)._pool_maxsize == 6
+        cdn = scraper._session.get_adapter('https://scontent.cdninstagram.com/1.jpg')
+        assert cdn._pool_maxsize == 6
+
+    def test_retried_responses_release_connections(self, tmp_path):
+        with FakeInstagramAPI(pages=1, posts_per_page=1, throttle_rate=0.5, seed=1) as api:
+            scraper = HashtagScraper('session', tmp_path).set_api_session(
+                throttle_retries=20, pool_maxsize=1, pool_block=True,
+                rate_limiter=RateLimiter(rate=None, backoff=0.001, max_backoff=0.01))
+
+            def download():
+                for _ in range(5):
+                    scraper._get(f'{api.url}/images/1.jpg', kind='image', stream=True).close()
+
+            thread = threading.Thread(target=download, daemon=True)
+            thread.start()
+            thread.join(timeout=5)
+            assert not thread.is_alive()
+        assert api.stats['throttled'] > 0 and api.stats['images'] == 5
+
+
+class MetricsTests:
+
+    def test_records_requests_and_retries(self, tmp_path):
+        with FakeInstagramAPI(pages=4, posts_per_page=3, image_size=1000, error_rate=0.2,
+                              throttle_rate=0.2, seed=3) as api:
+            scraper = session(HashtagScraper('session', tmp_path), throttle_retries=10)
+            metrics = []
+            scraper.metrics.add_hook(metrics.append)
+            posts = dict(scraper.iter_posts(api.hashtag_url('test')))
+            scraper.extract_images(posts, workers=2)
+        summary = scraper.metrics.summary()
+        assert summary['requests'] == len(metrics) == api.stats['requests']
+        assert summary['retries'] == api.stats['errors'] + api.stats['throttled'] > 0
+        assert summary['pages'] == 4 and summary['images'] == 12
+        assert summary['statuses']['page 200'] == 4
+        assert summary['bytes']['image'] >= 12 * 1000
+        assert summary['pages_per_second'] > 0
+        assert {metric.status for metric in metrics} <= {200, 429, 500}
+        assert all(metric.latency >= 0 for metric in metrics)
+
+    def test_exporters(self):
+        metrics = ScraperMetrics()
+        metrics.record_request(RequestMetric('url', 'page', 200, 0.5, 100, 0, 0.0, None))
+        metrics.record_request(RequestMetric('url', 'page', None, 0.1, None, 1, 2.0, 'Timeout'))
+        metrics.record_item('page')
+        assert json.loads(metrics.to_json())['errors'] == {'Timeout': 1}
+        text = metrics.to_prometheus()
+        assert 'instatools_scraper_requests_total{kind="page",status="200"} 1' in text
+        assert 'instatools_scraper_retries_total 1' in text
+        assert 'instatools_scraper_rate_limit_wait_seconds_total 2.0' in text
+        metrics.reset()
+        assert metrics.summary()['requests'] == 0
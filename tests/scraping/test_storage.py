@@ -0,0 +1,80 @@
+from instatools.scraping.scraping import Checkpoint
+from instatools.scraping.storage import SegmentStorage
+from instatools.preprocessing.preprocessing import Posts
+
+
+class SegmentStorageTests:
+
+    pages = {i: {'page': i, 'text': 'zażółć' * i} for i in range(1, 6)}
+
+    def test_append_and_read(self, tmp_path):
+        storage = SegmentStorage(tmp_path)
+        for page, content in self.pages.items():
+            storage.append(page, content)
+        storage = SegmentStorage(tmp_path)
+        assert storage.pages() == list(self.pages)
+        assert storage.read(3) == self.pages[3]
+
+    def test_sequential_read(self, tmp_path):
+        storage = SegmentStorage(tmp_path, max_size=100)
+        for page, content in self.pages.items():
+            storage.append(page, content)
+        segments = Posts._find_json_files(tmp_path)
+        assert len(segments) > 1
+        assert [content for segment in segments
+                for content in Posts._iter_json_lines(segment)] == list(self.pages.values())
+
+    def test_interrupted_write_is_dropped(self, tmp_path):
+        storage = SegmentStorage(tmp_path)
+        storage.append(1, self.pages[1])
+        segment = Posts._find_json_files(tmp_path)[0]
+        with open(segment, 'ab') as file:
+            file.write(b'\x1f\x8b\x08\x00broken')
+        storage = SegmentStorage(tmp_path)
+        storage.append(2, self.pages[2])
+        assert list(Posts._iter_json_lines(segment)) == [self.pages[1], self.pages[2]]
+
+    def test_interrupted_index_line_is_dropped(self, tmp_path):
+        storage = SegmentStorage(tmp_path)
+        storage.append(1, self.pages[1])
+        storage.append(2, self.pages[2])
+        index_path = tmp_path / 'segments.index'
+        lines = index_path.read_text(encoding='utf8').splitlines(keepends=True)
+        index_path.write_text(lines[0] + lines[1][:-2], encoding='utf8')
+        storage = SegmentStorage(tmp_path)
+        assert storage.pages() == [1]
+        storage.append(3, self.pages[3])
+        storage = SegmentStorage(tmp_path)
+        assert storage.pages() == [1, 3]
+        assert storage.read(1) == self.pages[1]
+        assert storage.read(3) == self.pages[3]
+
+    def test_segments_without_index(self, tmp_path):
+        storage = SegmentStorage(tmp_path, max_size=300)
+        for page, content in self.pages.items():
+            storage.append(page, content)
+        segments = Posts._find_json_files(tmp_path)
+        sizes = [segment.stat().st_size for segment in segments]
+        (tmp_path / 'segments.index').unlink()
+        with open(segments[-1], 'ab') as file:
+            file.write(b'\x1f\x8b\x08\x00broken')
+        storage = SegmentStorage(tmp_path, max_size=300)
+        assert [segment.stat().st_size for segment in segments[:-1]] == sizes[:-1]
+        assert segments[-1].stat().st_size == sizes[-1] + 10
+        assert [storage.read(page) for page in storage.pages()] == list(self.pages.values())
+        storage.append(6, {'page': 6})
+        assert len(Posts._find_json_files(tmp_path)) == len(segments) + 1
+        storage = SegmentStorage(tmp_path)
+        assert storage.read(6) == {'page': 6} and len(storage) == 6
+
+    def test_checkpoint_keeps_segments(self, tmp_path):
+        storage = SegmentStorage(tmp_path)
+        for page, content in self.pages.items():
+            storage.append(page, content)
+        (tmp_path / 'segments.index').unlink()
+        size = Posts._find_json_files(tmp_path)[0].stat().st_size
+        checkpoint = Checkpoint(tmp_path)
+        assert Posts._find_json_files(tmp_path)[0].stat().st_size == size
+        assert checkpoint.content['last_page'] == 5
+        contents = list(Posts._iter_json_lines(Posts._find_json_files(tmp_path)[0]))
+        assert contents == list(self.pages.values())
@@ -0,0 +1,61 @@
+from pathlib import Path
+import subprocess
+import sys
+import instatools
+
+ROOT = Path(instatools.__file__).parent.parent
+
+
+def loaded_modules(statement, cwd):
+    script = f'import sys\n{statement}\nprint(" ".join(sys.modules))'
+    output = subprocess.run([sys.executable, '-c', script], cwd=cwd, check=True,
+                            capture_output=True, text=True,
+                            env={'PYTHONPATH': str(ROOT)}).stdout
+    return set(output.split())
+
+
+class LazyImportTests:
+
+    def test_package_import_is_light(self, tmp_path):
+        modules = loaded_modules('import instatools', tmp_path)
+        assert not modules & {'pandas', 'requests', 'dateutil'}
+        assert not list(tmp_path.iterdir())
+
+    def test_scraping_does_not_load_pandas(self, tmp_path):
+        modules = loaded_modules('from instatools.scraping import HashtagScraper', tmp_path)
+        assert 'requests' in modules and 'pandas' not in modules
+        assert not Path(tmp_path, 'scraper.log').exists()
+
+    def test_preprocessing_loads_pandas_on_demand(self, tmp_path):
+        statement = 'from instatools.preprocessing import HashtagPosts\nHashtagPosts({})'
+        modules = loaded_modules(statement, tmp_path)
+        assert not modules & {'pandas', 'requests'}
+        modules = loaded_modules(statement + '.to_df()', tmp_path)
+        assert 'pandas' in modules
+
+    def test_log_file_created_by_scraper(self, tmp_path):
+        loaded_modules('from instatools.scraping import Scraper\nScraper("id", ".")', tmp_path)
+        assert Path(tmp_path, 'scraper.log').exists()
+
+    def test_attributes(self):
+        from instatools.preprocessing import HashtagPosts, PostsStore
+        from instatools.scraping import RateLimiter
+        assert instatools.preprocessing.HashtagPosts is HashtagPosts
+        assert 'PostsStore' in dir(instatools.preprocessing)
+        assert PostsStore.__module__ == 'instatools.preprocessing.store'
+        assert RateLimiter.__module__ == 'instatools.scraping.ratelimit'
+
+    def test_top_level_attributes(self):
+        from instatools import (
+            HashtagPosts, HashtagScraper, LocationPosts, LocationScraper, Scraper
+        )
+        assert instatools.HashtagScraper is HashtagScraper is instatools.scraping.HashtagScraper
+        assert LocationScraper is instatools.scraping.LocationScraper
+        assert Scraper is instatools.scraping.Scraper
+        assert HashtagPosts is instatools.preprocessing.HashtagPosts
+        assert LocationPosts is instatools.preprocessing.LocationPosts
+        assert {'HashtagPosts', 'Scraper', 'scraping'} <= set(dir(instatools))
+
+    def test_top_level_attributes_are_lazy(self, tmp_path):
+        modules = loaded_modules('import instatools\ninstatools.HashtagPosts', tmp_path)
+        assert not modules & {'pandas', 'requests'}